@@ -4,6 +4,8 @@ export interface Challenge {
   type: 'Connect' | 'Understand' | 'Act'
   points: number
   image: string | null
+  thumbnails: { small: string; medium: string; large: string } | null
+  imageStatus: 'none' | 'pending' | 'ready' | 'failed'
   startDate: string
   finishDate?: string
   imageDescription?: string
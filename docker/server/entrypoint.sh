@@ -21,6 +21,9 @@ fi
 echo "Applying database migrations"
 python manage.py migrate --noinput
 
+echo "Generating missing image thumbnails"
+python manage.py generate_thumbnails
+
 echo "Collecting static files"
 python manage.py collectstatic --noinput
 
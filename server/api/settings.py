@@ -67,6 +67,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "django_extensions",
     "rest_framework",
     "corsheaders",
@@ -77,6 +78,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "bingo.middleware.QueryTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,6 +87,9 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
+    "bingo.middleware.ReplicaStickinessMiddleware",
+    # Last, so that requests are only profiled after the other middleware has checked them.
+    "bingo.middleware.ProfilingMiddleware",
 ]
 
 CORS_ALLOWED_ORIGINS = FRONTEND_URLS
@@ -130,6 +135,45 @@ DATABASES = {
     }
 }
 
+# How database connections are managed. "pool" keeps a pool of connections in each process,
+# "persistent" keeps each thread's connection open for POSTGRES_CONN_MAX_AGE seconds,
+# and anything else, including the default "new", opens a new connection for every request.
+POSTGRES_CONNECTIONS = (os.environ.get("POSTGRES_CONNECTIONS") or "new").lower()
+if POSTGRES_CONNECTIONS == "pool":
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE") or 1),
+            "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE") or 4),
+            # Seconds a request waits for a free connection before failing.
+            "timeout": int(os.environ.get("POSTGRES_POOL_TIMEOUT") or 10),
+            # Seconds an unused connection above min_size is kept open for.
+            "max_idle": int(os.environ.get("POSTGRES_POOL_MAX_IDLE") or 300),
+        }
+    }
+    # Make sure each pooled connection is still alive before handing it out.
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif POSTGRES_CONNECTIONS == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("POSTGRES_CONN_MAX_AGE") or 60)
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# An optional read replica of the database, which the read-only views read from.
+# It uses the same credentials and connection settings as the primary database.
+if os.environ.get("POSTGRES_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ.get("POSTGRES_REPLICA_HOST"),
+        "PORT": os.environ.get("POSTGRES_REPLICA_PORT") or DATABASES["default"]["PORT"],
+        # Tests read the replica's data from the primary test database.
+        "TEST": {"MIRROR": "default"},
+    }
+REPLICA_DATABASE = "replica" if "replica" in DATABASES else None
+DATABASE_ROUTERS = ["bingo.routers.ReplicaRouter"]
+# Seconds a user's reads stay on the primary database after they change something, so they see their own changes.
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS") or 10)
+# The cache the users that have recently changed something are kept in. It must be shared between the server's
+# processes (not locmem), and the server won't start with a replica otherwise.
+REPLICA_STICKY_CACHE_ALIAS = os.environ.get("REPLICA_STICKY_CACHE_ALIAS") or "default"
+
 Q_CLUSTER = {
     'name': 'DjangORM',
     'workers': 1,
@@ -232,11 +276,127 @@ MEDIA_ROOT = os.path.join(BASE_DIR, MEDIA_DIR)
 
 MEDIA_URL = '/media/'
 
+# Directory holding uploaded images until they have been processed. It must not be served,
+# as the uploads still contain their metadata.
+TILE_UPLOAD_ROOT = os.environ.get("TILE_UPLOAD_ROOT") or os.path.join(BASE_DIR, "tile_uploads/")
+
+# Smaller copies saved of each uploaded image, as the length of their longest side in pixels.
+TILE_IMAGE_VARIANTS = {"small": 160, "medium": 480, "large": 1024}
+
+# Whether the files of deleted tiles are deleted by the django-q cluster, rather than when the deletion commits.
+FILE_CLEANUP_ASYNC = os.environ.get("FILE_CLEANUP_ASYNC", "true").lower() in ("1", "true", "yes")
+
+# Files that no tile refers to are only swept once they are older than this many seconds,
+# so that uploads of requests still in progress are left alone.
+ORPHAN_FILE_MIN_AGE = int(os.environ.get("ORPHAN_FILE_MIN_AGE") or 24 * 60 * 60)
+
+# Directory holding CSV exports written in the background. It must not be served, as exports contain personal details.
+EXPORT_ROOT = os.environ.get("EXPORT_ROOT") or os.path.join(BASE_DIR, "exports/")
+
+# Admin CSV exports of more rows than this are written in the background instead of during the request.
+EXPORT_BACKGROUND_THRESHOLD = int(os.environ.get("EXPORT_BACKGROUND_THRESHOLD") or 10000)
+
+# How many seconds each background export task writes for before queuing the rest of the export,
+# which must be less than the cluster's timeout.
+EXPORT_TIME_LIMIT = int(os.environ.get("EXPORT_TIME_LIMIT") or 60)
+
+# Superusers can profile a request by sending an X-Profile header or a `profile` query parameter. The stats are
+# saved in PROFILE_ROOT, which must not be served, and only the most recent PROFILE_CAPTURES_KEPT are kept.
+PROFILE_ROOT = os.environ.get("PROFILE_ROOT") or os.path.join(BASE_DIR, "profiles/")
+PROFILE_CAPTURES_KEPT = int(os.environ.get("PROFILE_CAPTURES_KEPT") or 100)
+
+# Whether uploaded images are processed by the django-q cluster, rather than during the request.
+TILE_IMAGE_ASYNC = os.environ.get("TILE_IMAGE_ASYNC", "true").lower() in ("1", "true", "yes")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# The cache backend. "locmem" keeps a separate cache in each process, while "redis" (which needs the redis
+# package) and "file" share one cache between processes, stored at CACHE_LOCATION.
+CACHE_BACKEND = (os.environ.get("CACHE_BACKEND") or "locmem").lower()
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION") or "redis://localhost:6379",
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_LOCATION") or BASE_DIR / "cache",
+            # Entries are culled at random beyond this, including the versions of each user's profile.
+            "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES") or 100000)},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cache holding the versions the grid, leaderboard and profile ETags are made from, which never expire, and the
+# grid and leaderboard responses for anonymous users, kept for RESPONSE_CACHE_TIMEOUT seconds. It must be shared
+# between the server's processes (not locmem) when there is more than one, or they send different ETags.
+RESPONSE_CACHE_ALIAS = os.environ.get("RESPONSE_CACHE_ALIAS") or "default"
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT") or 60)
+
+# Seconds each process, and the shared cache below, keeps the active bingo grid before checking for changes.
+# Changes made in the same process invalidate the cache immediately.
+GRID_CACHE_TIMEOUT = int(os.environ.get("GRID_CACHE_TIMEOUT") or 60)
+
+# Optional name of a cache in CACHES, shared between processes, that also holds the active bingo grid.
+GRID_CACHE_ALIAS = os.environ.get("GRID_CACHE_ALIAS") or None
+
+# Serve user search from an in-memory index of usernames kept by each process,
+# which is rebuilt after USER_SEARCH_INDEX_TIMEOUT seconds to pick up changes made by other processes.
+USER_SEARCH_INDEX = os.environ.get("USER_SEARCH_INDEX", "").lower() in ("1", "true", "yes")
+USER_SEARCH_INDEX_TIMEOUT = int(os.environ.get("USER_SEARCH_INDEX_TIMEOUT") or 300)
+
+# Cache holding the set of friends of each user, used for profile visibility checks, and how many seconds
+# it is kept. The sets decide who can see friends-only profiles, so they are only cached when the cache is
+# shared between processes, and are read from the database on every check with a locmem cache.
+FRIEND_CACHE_ALIAS = os.environ.get("FRIEND_CACHE_ALIAS") or "default"
+FRIEND_CACHE_TIMEOUT = int(os.environ.get("FRIEND_CACHE_TIMEOUT") or 300)
+
+# How many inactive users are deleted in each transaction, and how many seconds the deletion task runs for
+# before queuing itself again, which must be less than the cluster's timeout.
+INACTIVE_PURGE_BATCH_SIZE = int(os.environ.get("INACTIVE_PURGE_BATCH_SIZE") or 500)
+INACTIVE_PURGE_TIME_LIMIT = int(os.environ.get("INACTIVE_PURGE_TIME_LIMIT") or 60)
+
+# Count and time the database queries of each request, and send the timings in a Server-Timing header.
+REQUEST_TIMING = os.environ.get("REQUEST_TIMING", "").lower() in ("1", "true", "yes")
+
+# The most queries a request to each route (by URL name) is expected to make, including loading the logged in user.
+# With REQUEST_TIMING set, requests making more are logged as warnings. The tests check that every route has a
+# budget, keeps to it, and makes the same number of queries however much data there is.
+QUERY_BUDGETS = {
+    "token_obtain_pair": 2,
+    "token_refresh": 1,
+    "register_user": 3,
+    "update_preferences": 2,
+    "get_leaderboard": 4,
+    "current_user": 1,
+    "delete_friendship": 5,
+    "start_challenge": 5,
+    "all_friends_data": 2,
+    "get_bingo_grid": 4,
+    "accept_friendship": 4,
+    "get_profile_page": 5,
+    "complete_challenge": 16,
+    "request_friendship": 7,
+    "user_search": 3,
+    "update-bingo-grid": 27,
+    "request_verification": 1,
+    "confirm_email": 5,
+    "request_password_reset": 1,
+    "reset_password": 2,
+}
+
 # Points for completing bingo line and grid
 BINGO_COMPLETE = 100
 GRID_COMPLETE = 500
@@ -1,49 +1,51 @@
-from django.http import HttpResponse
+import csv
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.admin import action
-from django.db.models import ForeignKey
-from .models import User, TileInteraction
-
-
-def get_friendly_value(instance, field_name, value):
-    display_method = f'get_{field_name}_display'
-    if hasattr(instance, display_method):
-        return getattr(instance, display_method)()
-    elif isinstance(field := type(instance)._meta.get_field(field_name), ForeignKey):
-        return str(field.related_model.objects.get(pk=value))
-    else:
-        # If it's not a choice field or a foreign key, return the raw value
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.html import format_html
+from .exports import get_export_fields, get_export_queryset, get_readable_rows, start_export
+
+
+class Echo:
+    """
+    A file-like object that returns what is written to it, so that `csv.writer` returns each row as a string.
+    """
+
+    def write(self, value):
         return value
 
 
 @action(description="Export selected objects as CSV")
 def export2csv(modeladmin, request, queryset):
-    import csv
-
-    response = HttpResponse(
+    # Large exports are written by the django-q cluster, so they don't hold up a web worker.
+    total_rows = get_export_queryset(modeladmin, queryset).count()
+    if total_rows > settings.EXPORT_BACKGROUND_THRESHOLD:
+        if request.POST.get("select_across") == "1":
+            # Everything in the list is exported by its filters, rather than by copying every pk into the job.
+            job = start_export(model=modeladmin.model, filters=dict(request.GET.lists()), total_rows=total_rows,
+                               user=request.user)
+        else:
+            job = start_export(queryset, total_rows=total_rows, user=request.user)
+        url = reverse("admin:bingo_exportjob_change", args=[job.pk])
+        modeladmin.message_user(request, format_html(
+            'The export is being written in the background. It can be downloaded from <a href="{}">{}</a> once it is done.',
+            url, job), messages.INFO)
+        return None
+
+    fields = get_export_fields(modeladmin)
+    rows = get_readable_rows(get_export_queryset(modeladmin, queryset), fields)
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+
+    return StreamingHttpResponse(
+        stream(),
         content_type="text/csv",
         headers={
             "Content-Disposition": f'attachment; filename="{modeladmin.model._meta.model_name}s.csv"'},
     )
-
-    writer = csv.writer(response)
-    if modeladmin.model == User:
-        exclude = ('password', 'is_superuser', 'is_active')
-    elif modeladmin.model == TileInteraction:
-        exclude = ('image_display',)
-    else:
-        exclude = tuple()
-
-    fields = modeladmin.fields if modeladmin.fields else [
-        f.name for f in modeladmin.model._meta.fields()]
-    fields = [f for f in fields if f not in exclude]
-    writer.writerow(fields)
-    if modeladmin.model == User:
-        queryset = queryset.filter(is_superuser=False, is_active=True)
-    raw_values = queryset.values_list(*fields)
-    readable_rows = []
-    for instance, values in zip(queryset, raw_values):
-        readable_rows.append((get_friendly_value(instance, field_name, value)
-                             for field_name, value in zip(fields, values)))
-
-    writer.writerows(readable_rows)
-    return response
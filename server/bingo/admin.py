@@ -1,8 +1,15 @@
+import os
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.core.exceptions import PermissionDenied
 from django.forms import ModelForm, ValidationError
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import User, Challenge, Friendship, BingoGrid, TileInteraction
+from .models import User, Challenge, Friendship, BingoGrid, TileInteraction, ExportJob, ProfileCapture
+from .profiling import summarise
 
 
 @admin.register(User)
@@ -73,9 +80,9 @@ class BingoGridAdmin(admin.ModelAdmin):
 
 @admin.register(TileInteraction)
 class TileInteractionAdmin(admin.ModelAdmin):
-    fields = ('user', 'grid', 'position', 'description', 'image', 'completed',
+    fields = ('user', 'grid', 'position', 'description', 'image', 'image_status', 'completed',
               'consent', 'date_started', 'date_completed', 'image_display')
-    readonly_fields = ('image_display', 'date_started')
+    readonly_fields = ('image_display', 'image_status', 'date_started')
 
     list_display = ('user', 'grid', 'position', 'completed',
                     'consent', 'date_started', 'date_completed')
@@ -84,4 +91,87 @@ class TileInteractionAdmin(admin.ModelAdmin):
         return obj.get_image_html()
 
 
+class FileDownloadMixin:
+    """
+    Admin for objects holding a file written by the server, which is only downloaded through the admin.
+    The objects can be viewed, downloaded and deleted, but not added or changed.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    # disable the export2csv action
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        return {k: v for k, v in actions.items() if k != 'csv_export_selected'}
+
+    def can_download(self, obj):
+        return bool(obj.file)
+
+    def get_urls(self):
+        return [
+            path('<int:object_id>/download/', self.admin_site.admin_view(self.download_view),
+                 name=f'{self.opts.app_label}_{self.opts.model_name}_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, object_id):
+        obj = get_object_or_404(self.model, pk=object_id)
+        if not self.has_view_permission(request, obj):
+            raise PermissionDenied
+        if not self.can_download(obj):
+            raise Http404(f"{self.opts.verbose_name.capitalize()} has no file to download.")
+        try:
+            file = obj.file.open('rb')
+        except FileNotFoundError:
+            raise Http404(f"The file of {obj} no longer exists.")
+        return FileResponse(file, as_attachment=True, filename=os.path.basename(obj.file.name))
+
+    @admin.display(description='Download')
+    def download(self, obj):
+        if not self.can_download(obj):
+            return '-'
+        return format_html('<a href="{}">{}</a>',
+                           reverse(f'admin:{self.opts.app_label}_{self.opts.model_name}_download', args=[obj.pk]),
+                           os.path.basename(obj.file.name))
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(FileDownloadMixin, admin.ModelAdmin):
+    # Jobs are created by exporting objects, and only written by the django-q cluster.
+    fields = ('model', 'status', 'compress', 'progress', 'error', 'created_by', 'created_at', 'finished_at', 'download')
+    readonly_fields = fields
+
+    list_display = ('__str__', 'status', 'progress', 'created_by', 'created_at', 'download')
+
+    def can_download(self, obj):
+        return obj.status == ExportJob.DONE
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        if obj.total_rows is None:
+            return '-'
+        return f'{obj.rows_written} / {obj.total_rows} rows'
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(FileDownloadMixin, admin.ModelAdmin):
+    # Captures are created by profiling requests.
+    fields = ('method', 'path', 'route', 'status_code', 'duration_ms', 'created_by', 'created_at', 'download',
+              'top_functions')
+    readonly_fields = fields
+
+    list_display = ('__str__', 'route', 'status_code', 'duration_ms', 'created_by', 'created_at', 'download')
+    list_filter = ('route',)
+
+    @admin.display(description='Top functions')
+    def top_functions(self, obj):
+        try:
+            return format_html('<pre>{}</pre>', summarise(obj))
+        except OSError:
+            return '-'
+
+
 admin.site.unregister(Group)
@@ -0,0 +1,196 @@
+"""
+Benchmarks of the API endpoints, run by the `benchmark_endpoints` command against the data in the database.
+
+Each endpoint is requested with a sequence of requests generated from a random seed, made by users
+picked from the database. The sequence is timed twice: with cold caches, which are cleared before every
+request, and with warm caches, after the whole sequence has been requested once. Requests that change
+data are rolled back, so that every run sees the same data.
+
+The caches are cleared and filled with entries for the benchmark's data, so they must not be the server's:
+`private_caches()` gives the benchmark caches of its own.
+"""
+import os
+import random
+import statistics
+import time
+from contextlib import nullcontext
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import grid_cache
+from .models import TileInteraction, User
+from .search import username_index
+
+# How many of the users in the database the requests are made by.
+SAMPLE_USERS = 50
+
+
+def private_caches(directory):
+    """
+    Returns the CACHES setting with every cache that the server's processes share, such as a Redis or file
+    cache, replaced by a file cache in `directory`, so the benchmark's entries never reach the server.
+    Caches kept in the memory of each process are already private to the benchmark.
+    """
+    private = {}
+    for alias, cache in settings.CACHES.items():
+        if cache["BACKEND"] in ("django.core.cache.backends.locmem.LocMemCache",
+                                "django.core.cache.backends.dummy.DummyCache"):
+            private[alias] = cache
+        else:
+            private[alias] = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                              "LOCATION": os.path.join(directory, alias)}
+    return private
+
+
+def clear_caches():
+    for cache in caches.all():
+        cache.clear()
+    grid_cache.invalidate()
+    username_index.invalidate()
+
+
+def make_image():
+    file = BytesIO()
+    Image.new("RGB", (640, 480), "blue").save(file, "JPEG")
+    return SimpleUploadedFile("benchmark.jpg", file.getvalue(), content_type="image/jpeg")
+
+
+class BenchmarkData:
+    """
+    The users requests are made by, and the things they request.
+    """
+
+    def __init__(self, rng):
+        user_ids = list(User.objects.filter(is_active=True, is_superuser=False).values_list('pk', flat=True))
+        if not user_ids:
+            raise ValueError("There are no users to make requests with.")
+        self.users = list(User.objects.filter(pk__in=rng.sample(user_ids, min(SAMPLE_USERS, len(user_ids)))))
+        self.tokens = {user.pk: str(AccessToken.for_user(user)) for user in self.users}
+        self.usernames = list(User.objects.filter(pk__in=rng.sample(user_ids, min(SAMPLE_USERS, len(user_ids))))
+                              .values_list('username', flat=True))
+        # The tiles the users have started but not completed, which `complete_challenge` can complete.
+        self.started_tiles = list(TileInteraction.objects.filter(
+            user__in=self.users, grid__is_active=True, completed=False).values_list('user_id', 'position'))
+
+
+def leaderboard_request(rng, data):
+    return rng.choice(data.users), 'get', reverse('get_leaderboard'), {}
+
+
+def bingo_grid_request(rng, data):
+    return rng.choice(data.users), 'get', reverse('get_bingo_grid'), {}
+
+
+def find_user_request(rng, data):
+    prefix = rng.choice(data.usernames)[:rng.randint(1, 6)]
+    return rng.choice(data.users), 'post', reverse('user_search'), {'data': {'query_string': prefix}}
+
+
+def profile_page_request(rng, data):
+    return rng.choice(data.users), 'get', reverse('get_profile_page', args=[rng.choice(data.usernames)]), {}
+
+
+def all_friends_data_request(rng, data):
+    return rng.choice(data.users), 'get', reverse('all_friends_data'), {}
+
+
+def complete_challenge_request(rng, data):
+    if not data.started_tiles:
+        raise ValueError("None of the users have started tiles to complete.")
+    user_id, position = rng.choice(data.started_tiles)
+    user = next(user for user in data.users if user.pk == user_id)
+    return user, 'patch', reverse('complete_challenge'), {
+        'data': {'position': position, 'consent': True, 'image': make_image()}, 'format': 'multipart'}
+
+
+# The endpoints that can be benchmarked, by the name of their view.
+ENDPOINTS = {
+    'get_leaderboard': leaderboard_request,
+    'get_bingo_grid': bingo_grid_request,
+    'find_user': find_user_request,
+    'get_profile_page': profile_page_request,
+    'get_all_friends_data': all_friends_data_request,
+    'complete_challenge': complete_challenge_request,
+}
+
+
+def percentile(timings, percent):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+def summarise(timings, queries, statuses):
+    return {
+        'requests': len(timings),
+        'mean_ms': round(statistics.mean(timings), 3),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'max_ms': round(max(timings), 3),
+        'queries_mean': round(statistics.mean(queries), 2),
+        'queries_max': max(queries),
+        'errors': sum(status >= 400 for status in statuses),
+    }
+
+
+class Benchmark:
+    def __init__(self, requests=50, random_seed=0):
+        self.requests = requests
+        self.random_seed = random_seed
+        self.data = BenchmarkData(random.Random(random_seed))
+        self.client = APIClient()
+        self.queries = 0
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def request(self, user, method, path, kwargs):
+        """
+        Makes a request and returns how long it took in milliseconds, how many queries it made, and its status.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.data.tokens[user.pk]}")
+        # Uploaded files are read from the start each time they are sent.
+        for value in kwargs.get('data', {}).values():
+            if hasattr(value, 'seek'):
+                value.seek(0)
+        self.queries = 0
+        # Requests that can change data are rolled back, to leave the data as it was for the next request.
+        writes = method != 'get'
+        with connection.execute_wrapper(self.count_query), transaction.atomic() if writes else nullcontext():
+            start = time.perf_counter()
+            response = getattr(self.client, method)(path, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+            if writes:
+                transaction.set_rollback(True)
+        return elapsed, self.queries, response.status_code
+
+    def run(self, name):
+        """
+        Returns the results of an endpoint with cold and warm caches.
+        """
+        rng = random.Random(f"{self.random_seed}-{name}")
+        sequence = [ENDPOINTS[name](rng, self.data) for _ in range(self.requests)]
+        results = {}
+        for warm in (False, True):
+            clear_caches()
+            if warm:
+                for request in sequence:
+                    self.request(*request)
+            timings, queries, statuses = [], [], []
+            for request in sequence:
+                if not warm:
+                    clear_caches()
+                elapsed, count, status = self.request(*request)
+                timings.append(elapsed)
+                queries.append(count)
+                statuses.append(status)
+            results['warm' if warm else 'cold'] = summarise(timings, queries, statuses)
+        return results
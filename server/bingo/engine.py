@@ -0,0 +1,125 @@
+"""
+Bingo detection using completion bitmasks.
+
+Each user's progress in a grid is stored in `GridProgress` as bitmasks, where bit n is set when the
+tile in position n has been started/completed. Every row, column and diagonal also has a bitmask,
+so checking a line is a single `&` rather than a scan over the user's tiles.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import GridProgress
+
+GRID_WIDTH = 4
+
+LineMasks = namedtuple('LineMasks', ['rows', 'cols', 'diag', 'anti_diag', 'full'])
+
+
+@lru_cache
+def get_line_masks(width=GRID_WIDTH):
+    """
+    Returns the masks of each row, column and diagonal for a grid of the given width.
+    """
+    def mask(positions):
+        return sum(1 << position for position in positions)
+
+    return LineMasks(
+        rows=tuple(mask(range(row * width, (row + 1) * width)) for row in range(width)),
+        cols=tuple(mask(range(col, width * width, width)) for col in range(width)),
+        # Top left to bottom right.
+        diag=mask(range(0, width * width, width + 1)),
+        # Top right to bottom left.
+        anti_diag=mask(range(width - 1, width * width - 1, width - 1)),
+        full=(1 << width * width) - 1,
+    )
+
+
+def find_bingos(completed_mask, position, width=GRID_WIDTH):
+    """
+    Returns the bingos completed by the tile in `position`, given the user's completion mask
+    (which should already include that tile), in the form returned by the complete challenge view.
+    """
+    lines = get_line_masks(width)
+    row, col = divmod(position, width)
+    bingos = {'bingo_row': -1,
+              'bingo_col': -1,
+              'bingo_diag': -1,
+              'full_bingo': False,
+              'bingo_points': 0}
+
+    def is_complete(line):
+        return completed_mask & line == line
+
+    if is_complete(lines.rows[row]):
+        bingos['bingo_row'] = row
+        bingos['bingo_points'] += settings.BINGO_COMPLETE
+    if is_complete(lines.cols[col]):
+        bingos['bingo_col'] = col
+        bingos['bingo_points'] += settings.BINGO_COMPLETE
+    # Diagonals are denoted by the first row tile they contain.
+    if row == col and is_complete(lines.diag):
+        bingos['bingo_diag'] = 0
+        bingos['bingo_points'] += settings.BINGO_COMPLETE
+    if row + col == width - 1 and is_complete(lines.anti_diag):
+        bingos['bingo_diag'] = width - 1
+        bingos['bingo_points'] += settings.BINGO_COMPLETE
+    if is_complete(lines.full):
+        bingos['full_bingo'] = True
+        bingos['bingo_points'] += settings.GRID_COMPLETE
+    return bingos
+
+
+def bingo_points(completed_mask, width=GRID_WIDTH):
+    """
+    Returns the bingo points earned by all the bingos of a completion mask.
+    """
+    lines = get_line_masks(width)
+    points = sum(settings.BINGO_COMPLETE for line in (*lines.rows, *lines.cols, lines.diag, lines.anti_diag)
+                 if completed_mask & line == line)
+    if completed_mask & lines.full == lines.full:
+        points += settings.GRID_COMPLETE
+    return points
+
+
+def _update_progress(tile, started):
+    bit = 1 << tile.position
+    completed_mask = (F('completed_mask').bitor(bit) if tile.completed and started
+                      else F('completed_mask').bitand(~bit))
+    started_mask = F('started_mask').bitor(bit) if started else F('started_mask').bitand(~bit)
+    return GridProgress.objects.filter(user_id=tile.user_id, grid_id=tile.grid_id).update(
+        started_mask=started_mask, completed_mask=completed_mask)
+
+
+def record_tile(tile):
+    """
+    Sets the bits of a tile that has been saved in its user's progress.
+    """
+    if _update_progress(tile, started=True):
+        return
+    bit = 1 << tile.position
+    try:
+        with transaction.atomic():
+            GridProgress.objects.create(user_id=tile.user_id, grid_id=tile.grid_id, started_mask=bit,
+                                        completed_mask=bit if tile.completed else 0)
+    except IntegrityError:
+        # Another request created the progress first.
+        _update_progress(tile, started=True)
+
+
+def forget_tile(tile):
+    """
+    Clears the bits of a tile that has been deleted from its user's progress.
+    """
+    _update_progress(tile, started=False)
+
+
+def get_progress(user_id, grid_id):
+    """
+    Returns the user's progress in the grid, which is empty if they haven't started any tiles.
+    """
+    return (GridProgress.objects.filter(user_id=user_id, grid_id=grid_id).first()
+            or GridProgress(user_id=user_id, grid_id=grid_id))
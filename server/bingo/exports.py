@@ -0,0 +1,201 @@
+"""
+Exporting objects to CSV, in the fields and order shown in the admin.
+
+Small exports are streamed straight from the admin's export action. Larger ones are stored as an `ExportJob`,
+and `bingo.tasks.run_export_job` writes them to a CSV file in `EXPORT_ROOT` in the django-q cluster,
+recording its progress on the job after each chunk. The file is written `EXPORT_TIME_LIMIT` seconds at
+a time, each run queuing the next, so that a large export doesn't hold up the cluster's other tasks.
+Finished exports are downloaded from the admin.
+
+A job doesn't copy the objects it exports. Exports of everything in the admin's list store its filters, and
+the objects are read again from the list in pk order, a chunk after the last pk written at a time.
+"""
+import csv
+import gzip
+import os
+import time
+from io import StringIO
+from itertools import batched
+
+from django.apps import apps
+from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.db.models import ForeignKey
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django_q.tasks import async_task
+
+from .models import ExportJob, TileInteraction, User
+
+# How many objects are read from the database, and have their foreign keys resolved, at a time.
+EXPORT_CHUNK_SIZE = 2000
+
+
+def get_export_fields(modeladmin):
+    if modeladmin.model == User:
+        exclude = ('password', 'is_superuser', 'is_active')
+    elif modeladmin.model == TileInteraction:
+        exclude = ('image_display',)
+    else:
+        exclude = tuple()
+
+    fields = modeladmin.fields if modeladmin.fields else [
+        f.name for f in modeladmin.model._meta.fields]
+    return [f for f in fields if f not in exclude]
+
+
+def get_export_queryset(modeladmin, queryset):
+    if modeladmin.model == User:
+        queryset = queryset.filter(is_superuser=False, is_active=True)
+    return queryset
+
+
+def get_readable_rows(queryset, fields, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields the values of `fields` for each object in the queryset, with choices replaced by their labels
+    and foreign keys by the related object as a string. Objects are read `chunk_size` at a time,
+    and the related objects of each chunk are loaded together.
+    """
+    model_fields = [queryset.model._meta.get_field(field_name) for field_name in fields]
+    choice_labels = {index: dict(field.flatchoices) for index, field in enumerate(model_fields) if field.choices}
+    related_models = {index: field.related_model for index, field in enumerate(model_fields)
+                      if isinstance(field, ForeignKey)}
+    # Labels of related objects are kept for the whole export, as the same objects are referenced by many rows.
+    related_labels = {index: {} for index in related_models}
+
+    rows = queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    for chunk in batched(rows, chunk_size):
+        for index, related_model in related_models.items():
+            labels = related_labels[index]
+            missing = {row[index] for row in chunk if row[index] is not None} - labels.keys()
+            if missing:
+                labels.update((pk, str(obj)) for pk, obj in related_model._base_manager.in_bulk(missing).items())
+
+        for row in chunk:
+            row = list(row)
+            for index, labels in choice_labels.items():
+                row[index] = labels.get(row[index], row[index])
+            for index, labels in related_labels.items():
+                row[index] = labels.get(row[index], row[index])
+            yield row
+
+
+class SelectionChangeList(ChangeList):
+    """
+    The admin's list of a model, without counting or loading the objects it shows.
+    """
+
+    def get_results(self, request):
+        pass
+
+
+def get_changelist_queryset(modeladmin, filters, user):
+    """
+    Returns the objects the admin's list shows `user` with the query parameters `filters`, as lists by name.
+    """
+    request = HttpRequest()
+    request.GET = QueryDict(mutable=True)
+    for name, values in filters.items():
+        request.GET.setlist(name, values)
+    request.user = user or AnonymousUser()
+    list_display = modeladmin.get_list_display(request)
+    changelist = SelectionChangeList(
+        request, modeladmin.model, list_display, modeladmin.get_list_display_links(request, list_display),
+        modeladmin.get_list_filter(request), modeladmin.date_hierarchy, modeladmin.get_search_fields(request),
+        modeladmin.get_list_select_related(request), modeladmin.list_per_page, modeladmin.list_max_show_all,
+        modeladmin.list_editable, modeladmin, modeladmin.get_sortable_by(request), modeladmin.search_help_text)
+    return changelist.queryset
+
+
+def get_job_queryset(job):
+    """
+    Returns the admin of the exported model, and the objects a job exports in pk order.
+    """
+    model = apps.get_model(job.model)
+    modeladmin = admin.site.get_model_admin(model)
+    if job.filters is not None:
+        queryset = get_changelist_queryset(modeladmin, job.filters, job.created_by)
+    elif job.ids is not None:
+        queryset = model._default_manager.filter(pk__in=job.ids)
+    else:
+        queryset = model._default_manager.all()
+    return modeladmin, get_export_queryset(modeladmin, queryset).order_by("pk")
+
+
+def start_export(queryset=None, model=None, filters=None, total_rows=None, compress=False, user=None, queue=True):
+    """
+    Creates an export job and queues it once the current transaction commits, unless `queue` is False.
+    The job exports what the admin's list of `model` shows with the query parameters `filters`, or the objects
+    in `queryset`, which are stored by pk so should only be a page of them, or every object of `model`.
+    How many objects there are is counted unless it is given as `total_rows`.
+    """
+    job = ExportJob.objects.create(
+        model=(model or queryset.model)._meta.label_lower,
+        filters=filters,
+        # The objects are stored by pk, rather than as a query which might not load in another version of Django.
+        ids=list(queryset.order_by("pk").values_list("pk", flat=True)) if filters is None and queryset is not None else None,
+        compress=compress,
+        created_by=user,
+    )
+    if total_rows is None:
+        total_rows = get_job_queryset(job)[1].count()
+    job.total_rows = total_rows
+    job.save(update_fields=["total_rows"])
+    if queue:
+        transaction.on_commit(lambda: async_task("bingo.tasks.run_export_job", job.pk, group="exports"))
+    return job
+
+
+def write_export(job, time_limit=None):
+    """
+    Appends the rows after the last ones written to the CSV file of a job, a chunk at a time, until they have
+    all been written or `time_limit` seconds have passed. Returns whether the file is complete, in which case
+    it is given its final name.
+    """
+    started = time.monotonic()
+    modeladmin, queryset = get_job_queryset(job)
+    fields = get_export_fields(modeladmin)
+
+    name = f"{queryset.model._meta.model_name}s-{job.pk}.csv" + (".gz" if job.compress else "")
+    path = job.file.storage.path(name)
+
+    def encode(rows):
+        text = StringIO()
+        csv.writer(text).writerows(rows)
+        data = text.getvalue().encode()
+        # Each chunk is its own gzip member, and a gzip file can be made of several.
+        return gzip.compress(data) if job.compress else data
+
+    try:
+        if not job.bytes_written:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".part", "ab") as file:
+            # Drop anything written by an earlier run that was stopped before recording it.
+            file.truncate(job.bytes_written)
+            if not job.bytes_written:
+                file.write(encode([fields]))
+            while True:
+                remaining = queryset if job.last_pk is None else queryset.filter(pk__gt=job.last_pk)
+                pks = list(remaining.values_list("pk", flat=True)[:EXPORT_CHUNK_SIZE])
+                if not pks:
+                    break
+                rows = list(get_readable_rows(remaining.filter(pk__lte=pks[-1]), fields))
+                file.write(encode(rows))
+                file.flush()
+                job.rows_written += len(rows)
+                job.last_pk = pks[-1]
+                job.bytes_written = file.tell()
+                ExportJob.objects.filter(pk=job.pk).update(
+                    rows_written=job.rows_written, last_pk=job.last_pk, bytes_written=job.bytes_written)
+                if time_limit is not None and time.monotonic() - started >= time_limit:
+                    return False
+        os.replace(path + ".part", path)
+    except Exception:
+        if os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        raise
+
+    ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.DONE, file=name, finished_at=timezone.now())
+    return True
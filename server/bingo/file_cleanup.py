@@ -0,0 +1,59 @@
+"""
+Deferred deletion of the files of deleted or replaced objects.
+
+Files are never deleted while the transaction that stopped using them is still open, since it may be
+rolled back. Instead, `delete_later()` collects them, and once the transaction commits, every file
+collected in it is deleted together by a single `bingo.tasks.delete_files` task in the django-q cluster.
+Files left behind anyway, such as uploads of requests that failed, are removed by
+`bingo.tasks.sweep_orphan_files`.
+"""
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django_q.tasks import async_task
+
+from .images import upload_storage
+from .storage import SettingStorage
+from .transactions import on_commit_batch
+
+# The storages files can be deleted from, by the names they are queued with.
+STORAGES = {
+    "media": default_storage,
+    "uploads": upload_storage,
+    "exports": SettingStorage("EXPORT_ROOT"),
+    "profiles": SettingStorage("PROFILE_ROOT"),
+}
+# The storages of tile images, which `bingo.tasks.sweep_orphan_files` removes the files no tile refers to from.
+TILE_STORAGES = ("media", "uploads")
+
+
+def queue_deletion(files):
+    async_task("bingo.tasks.delete_files", files, group="file-cleanup", sync=not settings.FILE_CLEANUP_ASYNC)
+
+
+class DeletionBatch:
+    """
+    The files to delete once a transaction (or savepoint) commits.
+    """
+
+    def __init__(self):
+        self.files = []
+
+    def __call__(self):
+        if self.files:
+            queue_deletion(self.files)
+
+
+def delete_later(storage_name, names, using=None):
+    """
+    Deletes the named files from one of the `STORAGES` after the current transaction commits,
+    or straight away when there is no transaction.
+    """
+    files = [[storage_name, name] for name in names if name]
+    if not files:
+        return
+    # Added to the batch of the current savepoint, so the files are dropped with it if it is rolled back.
+    batch = on_commit_batch(DeletionBatch, using)
+    if batch is None:
+        queue_deletion(files)
+    else:
+        batch.files.extend(files)
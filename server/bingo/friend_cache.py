@@ -0,0 +1,67 @@
+"""
+Cache of the ids of each user's accepted friends.
+
+Profile visibility checks look up whether two users are friends on every profile view, so each user's
+friends are kept as a set in the `FRIEND_CACHE_ALIAS` cache for `FRIEND_CACHE_TIMEOUT` seconds. The
+sets of both users are dropped from `bingo/signals.py` whenever a friendship is saved or deleted.
+
+They decide who can see friends-only profiles, so a set must never outlive the friendship in another process.
+The sets are only cached when the cache is shared between processes (such as CACHE_BACKEND=redis or file),
+and are read from the database every time with a process-local locmem cache.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+
+from .models import Friendship
+
+
+def _cache():
+    """
+    Returns the cache the friends are kept in, or None if it isn't shared, so that a process can't keep
+    the friends of a user after another process removes one.
+    """
+    cache = caches[settings.FRIEND_CACHE_ALIAS]
+    return None if isinstance(cache, (LocMemCache, DummyCache)) else cache
+
+
+def _key(user_id):
+    return f'bingo:friends:{user_id}'
+
+
+def get_friend_ids(user_id):
+    """
+    Returns a set of the ids of the user's accepted friends.
+    """
+    cache = _cache()
+    friend_ids = cache.get(_key(user_id)) if cache is not None else None
+    if friend_ids is None:
+        # Read from the primary database, so that a lagging replica can't put old friendships in the cache.
+        friendships = Friendship.objects.using(DEFAULT_DB_ALIAS).filter(
+            Q(requester_id=user_id) | Q(receiver_id=user_id), status=Friendship.ACCEPTED
+        ).values_list('requester_id', 'receiver_id')
+        friend_ids = frozenset(receiver_id if requester_id == user_id else requester_id
+                               for requester_id, receiver_id in friendships)
+        if cache is not None:
+            cache.set(_key(user_id), friend_ids, settings.FRIEND_CACHE_TIMEOUT)
+    return friend_ids
+
+
+def are_friends(user, other_user):
+    return other_user.pk in get_friend_ids(user.pk)
+
+
+def invalidate(*user_ids):
+    """
+    Drops the cached friends of the users now, and again once the current transaction commits,
+    so that a request can't cache their old friends in between.
+    """
+    cache = _cache()
+    if cache is None:
+        return
+    keys = [_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
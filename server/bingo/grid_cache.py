@@ -0,0 +1,134 @@
+"""
+Cache of the active bingo grid, and of the challenges in every grid.
+
+The active grid only changes a few times a year, so it is loaded and serialised once and then served
+from memory. Each process keeps its own copy for `GRID_CACHE_TIMEOUT` seconds. If `GRID_CACHE_ALIAS`
+names a cache shared between processes, the snapshot is also stored there for as long, so a process whose
+copy has expired can pick it up without touching the database. A process that loaded the grid just before
+another process invalidated it can store the old grid after the invalidation, so it mustn't be kept longer.
+
+The ordered challenges of other grids, used to resolve past tiles, are also kept by each process
+for `GRID_CACHE_TIMEOUT` seconds.
+
+The cache is invalidated from `bingo/signals.py` whenever a grid, its challenges, or a challenge changes.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import BingoGrid
+from .serializers import ChallengeSerializer
+
+# `grid` and `challenges` are model instances, `data` is the serialised grid.
+# These are shared between requests, so they must not be modified.
+GridSnapshot = namedtuple('GridSnapshot', ['grid', 'challenges', 'data'])
+
+SHARED_CACHE_KEY = 'bingo:active-grid'
+
+_lock = threading.Lock()
+_local = {'snapshot': None, 'expires': 0.0, 'generation': 0}
+# Maps grid ids to (expiry time, ordered list of challenges).
+_grid_challenges = {}
+
+
+def _shared_cache():
+    return caches[settings.GRID_CACHE_ALIAS] if settings.GRID_CACHE_ALIAS else None
+
+
+def _load():
+    # Read from the primary database, so that a lagging replica can't put an old grid in the cache.
+    grid = BingoGrid.objects.using(DEFAULT_DB_ALIAS).get(is_active=True)
+    challenges = list(grid.challenges.all())
+    data = {
+        'grid_id': grid.grid_id,
+        'challenges': [dict(challenge) for challenge in ChallengeSerializer(challenges, many=True).data]
+    }
+    return GridSnapshot(grid, challenges, data)
+
+
+def get_active_grid():
+    """
+    Returns a `GridSnapshot` of the active grid, only querying the database when it is not cached.
+    Raises `BingoGrid.DoesNotExist` if there is no active grid.
+    """
+    snapshot = _local['snapshot']
+    if snapshot is not None and time.monotonic() < _local['expires']:
+        return snapshot
+
+    generation = _local['generation']
+    shared = _shared_cache()
+    snapshot = shared.get(SHARED_CACHE_KEY) if shared else None
+    if snapshot is None:
+        snapshot = _load()
+        if shared and generation == _local['generation']:
+            shared.set(SHARED_CACHE_KEY, snapshot, settings.GRID_CACHE_TIMEOUT)
+
+    with _lock:
+        # Don't keep the snapshot if the grid was invalidated while it was being loaded.
+        if generation == _local['generation']:
+            _local['snapshot'] = snapshot
+            _local['expires'] = time.monotonic() + settings.GRID_CACHE_TIMEOUT
+    return snapshot
+
+
+def get_grid_challenges(grid_ids):
+    """
+    Returns a dictionary mapping each of the grid ids to the grid's ordered list of challenges.
+    Grids that aren't cached are loaded together in a single query.
+    """
+    grid_ids = set(grid_ids)
+    now = time.monotonic()
+    challenges = {}
+    for grid_id in grid_ids:
+        expires, grid_challenges = _grid_challenges.get(grid_id, (0.0, None))
+        if now < expires:
+            challenges[grid_id] = grid_challenges
+
+    missing = grid_ids - challenges.keys()
+    if missing:
+        generation = _local['generation']
+        loaded = {grid_id: [] for grid_id in missing}
+        grid_challenge_links = (BingoGrid.challenges.through.objects.using(DEFAULT_DB_ALIAS)
+                                .filter(bingogrid_id__in=missing)
+                                .select_related('challenge').order_by('bingogrid_id', 'sort_value'))
+        for link in grid_challenge_links:
+            loaded[link.bingogrid_id].append(link.challenge)
+        expires = time.monotonic() + settings.GRID_CACHE_TIMEOUT
+        with _lock:
+            if generation == _local['generation']:
+                _grid_challenges.update((grid_id, (expires, grid_challenges))
+                                        for grid_id, grid_challenges in loaded.items())
+        challenges.update(loaded)
+    return challenges
+
+
+def get_tile_challenges(tiles):
+    """
+    Returns the challenge of each tile, in the same order as the tiles.
+    """
+    tiles = list(tiles)
+    challenges = get_grid_challenges(tile.grid_id for tile in tiles)
+    return [challenges[tile.grid_id][tile.position] for tile in tiles]
+
+
+def _clear():
+    with _lock:
+        _grid_challenges.clear()
+        _local['snapshot'] = None
+        _local['generation'] += 1
+    shared = _shared_cache()
+    if shared:
+        shared.delete(SHARED_CACHE_KEY)
+
+
+def invalidate():
+    """
+    Drops the cached grid now, and again once the current transaction commits,
+    so that a request can't cache the old grid in between.
+    """
+    _clear()
+    transaction.on_commit(_clear)
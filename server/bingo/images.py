@@ -0,0 +1,68 @@
+"""
+Storage and processing of the images uploaded when completing challenges.
+
+Uploads are saved as they are to `TILE_UPLOAD_ROOT`, which is never served, so that requests don't
+wait for the image to be decoded and resized. A django-q task (`bingo.tasks.process_tile_image`) then
+saves a resized copy without metadata to the tile's `image` and deletes the upload.
+
+Smaller WebP variants of each image, listed in `TILE_IMAGE_VARIANTS`, are saved next to it
+as `<name>_<variant>.webp`, so pages showing many tiles don't have to download every full image.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .storage import SettingStorage
+
+
+# Uploads that haven't been processed yet.
+upload_storage = SettingStorage("TILE_UPLOAD_ROOT")
+
+
+def variant_name(name, variant):
+    return f"{os.path.splitext(name)[0]}_{variant}.webp"
+
+
+def save_variants(image):
+    """
+    Saves every variant of an image, replacing any existing ones.
+    """
+    with image.open("rb"):
+        original = Image.open(image)
+        original.load()
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA" if "transparency" in original.info else "RGB")
+    for variant, size in settings.TILE_IMAGE_VARIANTS.items():
+        thumbnail = original.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        thumbnail.save(buffer, format="WEBP", quality=80)
+        name = variant_name(image.name, variant)
+        image.storage.delete(name)
+        image.storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def variants_exist(image):
+    return all(image.storage.exists(variant_name(image.name, variant)) for variant in settings.TILE_IMAGE_VARIANTS)
+
+
+def get_image_names(name):
+    """
+    Returns the names of an image and all of its variants.
+    """
+    return [name] + [variant_name(name, variant) for variant in settings.TILE_IMAGE_VARIANTS]
+
+
+def delete_variants(image):
+    for variant in settings.TILE_IMAGE_VARIANTS:
+        image.storage.delete(variant_name(image.name, variant))
+
+
+def variant_urls(image):
+    """
+    Returns a dictionary mapping each variant to the URL of that variant of the image.
+    """
+    return {variant: image.storage.url(variant_name(image.name, variant)) for variant in settings.TILE_IMAGE_VARIANTS}
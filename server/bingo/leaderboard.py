@@ -0,0 +1,118 @@
+"""
+Incrementally maintained leaderboard.
+
+Instead of ranking every user on each request, `LeaderboardScore` stores how many ranked users
+(active, non-superusers) hold each distinct points total. A user's dense rank is one more than
+the number of distinct totals above theirs, so rank lookups only depend on how many distinct
+scores exist, not on how many users there are.
+
+The scores are moved whenever a user is saved (see `bingo/signals.py`). Changes made with
+`QuerySet.update()` bypass the signals and must call `move()` themselves, or be followed by `rebuild()`.
+Both also invalidate the cached leaderboard responses (see `bingo/response_cache.py`).
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from . import response_cache
+from .models import LeaderboardScore, User
+
+logger = logging.getLogger(__file__)
+
+
+def ranked_users():
+    return User.objects.filter(is_superuser=False, is_active=True)
+
+
+def _increment(points, amount):
+    updated = LeaderboardScore.objects.filter(points=points).update(
+        user_count=F('user_count') + amount)
+    if not updated:
+        try:
+            with transaction.atomic():
+                LeaderboardScore.objects.create(points=points, user_count=amount)
+        except IntegrityError:
+            # Another request created this score first.
+            LeaderboardScore.objects.filter(points=points).update(
+                user_count=F('user_count') + amount)
+
+
+def move(old_points, new_points):
+    """
+    Moves a single user from the `old_points` score to the `new_points` score.
+    Either may be None, meaning the user was not (or is no longer) ranked.
+    """
+    if old_points == new_points:
+        return
+    changes = []
+    if old_points is not None:
+        changes.append((old_points, -1))
+    if new_points is not None:
+        changes.append((new_points, 1))
+    # Always touch scores in the same order so concurrent moves cannot deadlock.
+    with transaction.atomic():
+        for points, amount in sorted(changes):
+            _increment(points, amount)
+
+
+def sync_user(user, created=False):
+    """
+    Brings the leaderboard in line with a user that has just been saved.
+    """
+    new_points = user.get_ranked_points()
+    if created:
+        move(None, new_points)
+    elif hasattr(user, '_ranked_points'):
+        move(user._ranked_points, new_points)
+    else:
+        # We don't know what the user was ranked with before this save, so start from scratch.
+        logger.warning(f"Leaderboard entry of {user} was unknown when saved, rebuilding leaderboard.")
+        rebuild()
+    user._ranked_points = new_points
+
+
+def add_points(user, points):
+    """
+    Adds points to a user in the database, without overwriting concurrent changes,
+    and moves them on the leaderboard. `user.total_points` is updated to the new total.
+    """
+    User.objects.filter(pk=user.pk).update(total_points=F('total_points') + points)
+    user.refresh_from_db(fields=['total_points'])
+    new_points = user.get_ranked_points()
+    move(None if new_points is None else new_points - points, new_points)
+    response_cache.invalidate(response_cache.LEADERBOARD)
+    response_cache.invalidate(response_cache.profile(user.pk))
+
+
+def rebuild():
+    """
+    Recounts every score from the user table.
+    """
+    counts = ranked_users().order_by().values('total_points').annotate(user_count=Count('pk'))
+    with transaction.atomic():
+        LeaderboardScore.objects.all().delete()
+        LeaderboardScore.objects.bulk_create(
+            LeaderboardScore(points=row['total_points'], user_count=row['user_count']) for row in counts)
+    response_cache.invalidate(response_cache.LEADERBOARD)
+
+
+def get_rank(points):
+    """
+    Returns the dense rank of a user with the given points.
+    """
+    return LeaderboardScore.objects.filter(points__gt=points, user_count__gt=0).count() + 1
+
+
+def get_top_users(size):
+    """
+    Returns the `size` highest ranked users, each with a `rank` attribute.
+    """
+    users = list(ranked_users().order_by('-total_points', 'username')[:size])
+    # The top users can hold at most `size` distinct scores, so only those are needed to rank them.
+    top_scores = (LeaderboardScore.objects.filter(user_count__gt=0)
+                  .order_by('-points').values_list('points', flat=True)[:size])
+    ranks = {points: rank for rank, points in enumerate(top_scores, start=1)}
+    for user in users:
+        user.rank = ranks.get(user.total_points) or get_rank(user.total_points)
+    return users
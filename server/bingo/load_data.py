@@ -0,0 +1,203 @@
+"""
+Synthetic data for benchmarks and load tests.
+
+`seed()` fills the database with an active bingo grid, and users with friendships and tiles in it. The
+data is generated from a random seed, so the same arguments always create the same data. Users are
+named `load0000000`, `load0000001`, ... and all share the password `PASSWORD`, which is only hashed once.
+
+To resemble real activity, friend counts follow a power law, so most users have a few friends and a
+few users have very many, and popular users are befriended more often. How many tiles users start is
+skewed the same way, so most start a few and some finish the grid, and how many of their tiles users
+complete varies between users.
+
+Rows are written with PostgreSQL's COPY, which skips the model signals, so each user's points (including
+bingos) and grid progress are worked out from their generated tiles, and the leaderboard is rebuilt at
+the end. Users are given ids after the highest existing one, so nothing else should create users while
+seeding.
+"""
+import bisect
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import grid_cache, leaderboard, response_cache
+from .engine import bingo_points
+from .models import BingoGrid, Challenge, Friendship, GridProgress, TileInteraction, User
+from .search import username_index
+
+PASSWORD = "Password123"
+USERNAME_PREFIX = "load"
+BATCH_SIZE = 10000
+# The exponent of the power law that friend counts follow.
+FRIEND_COUNT_EXPONENT = 2.5
+# How many days ago the earliest tiles were started.
+ACTIVITY_DAYS = 90
+
+
+def username(number):
+    return f"{USERNAME_PREFIX}{number:07d}"
+
+
+def is_seeded():
+    return User.objects.filter(username=username(0)).exists()
+
+
+def count():
+    """
+    Returns the number of objects in the database of each model that is seeded.
+    """
+    return {"users": User.objects.count(), "friendships": Friendship.objects.count(),
+            "tiles": TileInteraction.objects.count()}
+
+
+def copy_rows(model, fields, rows):
+    """
+    Writes rows of values for the model's `fields` to its table with COPY, and returns how many were written.
+    Other columns are set to their default, apart from an auto-incrementing primary key, which the database sets.
+    """
+    now = timezone.now()
+    columns = [field for field in model._meta.concrete_fields if field.attname in fields or not field.primary_key]
+    # Each column is taken from the row at an index, or is a constant default.
+    template = []
+    for field in columns:
+        if field.attname in fields:
+            template.append((fields.index(field.attname), None))
+        else:
+            auto_now = getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+            template.append((None, field.get_db_prep_save(now if auto_now else field.get_default(), connection)))
+
+    quote = connection.ops.quote_name
+    sql = f"COPY {quote(model._meta.db_table)} ({', '.join(quote(field.column) for field in columns)}) FROM STDIN"
+    written = 0
+    with connection.cursor() as cursor, cursor.cursor.copy(sql) as copy:
+        for row in rows:
+            copy.write_row([default if index is None else row[index] for index, default in template])
+            written += 1
+    return written
+
+
+def create_grid(rng):
+    challenge_types = [challenge_type for challenge_type, _ in Challenge.CHALLENGE_TYPES]
+    challenges = Challenge.objects.bulk_create(
+        Challenge(name=f"{USERNAME_PREFIX.capitalize()} Challenge #{position}",
+                  description="A challenge created for load testing.",
+                  challenge_type=challenge_types[position % len(challenge_types)], points=rng.randrange(10, 110, 10))
+        for position in range(16))
+    BingoGrid.objects.filter(is_active=True).update(is_active=False)
+    grid = BingoGrid.objects.create(is_active=True)
+    grid.challenges.add(*challenges)
+    return grid, challenges
+
+
+def generate_tiles(rng, tiles, completion, now):
+    """
+    Returns a user's tiles as (position, completed, date started, date completed).
+    """
+    # Beta distributions with the requested means, skewed towards starting few tiles.
+    started_share = min(max(tiles / 16, 0.01), 0.99)
+    completed_share = min(max(completion, 0.01), 0.99)
+    started = round(16 * rng.betavariate(0.8, 0.8 * (1 - started_share) / started_share))
+    user_completion = rng.betavariate(2, 2 * (1 - completed_share) / completed_share)
+    user_tiles = []
+    for position in rng.sample(range(16), started):
+        date_started = now - timedelta(days=ACTIVITY_DAYS * rng.random())
+        if rng.random() < user_completion:
+            user_tiles.append((position, True, date_started, date_started + (now - date_started) * rng.random()))
+        else:
+            user_tiles.append((position, False, date_started, None))
+    return user_tiles
+
+
+def generate_friendships(rng, user_ids, friends):
+    """
+    Yields (requester id, receiver id, status) for friendships between the users, whose friend counts
+    follow a power law with a mean of `friends`.
+    """
+    # Pareto distributed popularity, scaled to the requested mean.
+    shape = FRIEND_COUNT_EXPONENT - 1
+    scale = friends * (shape - 1) / shape
+    popularity = [rng.paretovariate(shape) * scale for _ in user_ids]
+    cumulative = list(itertools.accumulate(popularity))
+    for index, user_id in enumerate(user_ids):
+        if index == 0:
+            continue
+        # Each user picks half of their friends from the users before them, weighted by popularity, and
+        # is picked by the users after them for the other half, so each pair is only picked once.
+        wanted = min(index, round(popularity[index] / 2))
+        picked = set()
+        for _ in range(3 * wanted):
+            if len(picked) == wanted:
+                break
+            picked.add(bisect.bisect_right(cumulative, rng.random() * cumulative[index - 1], hi=index - 1))
+        for other in sorted(picked):
+            status = Friendship.ACCEPTED if rng.random() < 0.8 else Friendship.PENDING
+            if rng.random() < 0.5:
+                yield user_id, user_ids[other], status
+            else:
+                yield user_ids[other], user_id, status
+
+
+def seed(users=1000, friends=10, tiles=6, completion=0.6, random_seed=0, batch_size=BATCH_SIZE):
+    """
+    Creates `users` users in a new active grid, with on average `friends` friendships, `tiles` started tiles,
+    and `completion` of their started tiles completed. Returns the number of objects created of each model.
+    """
+    password = make_password(PASSWORD)
+    now = timezone.now()
+    counts = {"users": 0, "friendships": 0, "tiles": 0}
+    # Each kind of data has its own random numbers, so changing how much of one is made doesn't change the others.
+    tile_rng = random.Random(f"{random_seed}-tiles")
+    user_rng = random.Random(f"{random_seed}-users")
+
+    with transaction.atomic():
+        grid, challenges = create_grid(random.Random(f"{random_seed}-grid"))
+        first_id = (User.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+        user_ids = range(first_id, first_id + users)
+
+        for start in range(0, users, batch_size):
+            user_rows, tile_rows, progress_rows = [], [], []
+            for number in range(start, min(start + batch_size, users)):
+                user_id = first_id + number
+                started_mask = completed_mask = 0
+                for position, completed, date_started, date_completed in generate_tiles(tile_rng, tiles, completion, now):
+                    tile_rows.append((user_id, grid.pk, position, completed, completed, date_started, date_completed))
+                    started_mask |= 1 << position
+                    if completed:
+                        completed_mask |= 1 << position
+                if started_mask:
+                    progress_rows.append((user_id, grid.pk, started_mask, completed_mask))
+                points = sum(challenge.points for position, challenge in enumerate(challenges)
+                             if completed_mask & (1 << position)) + bingo_points(completed_mask)
+                user_rows.append((user_id, username(number), f"{username(number)}@example.com", password,
+                                  user_rng.randrange(6), user_rng.choice(User.Visibility.values), points))
+
+            counts["users"] += copy_rows(
+                User, ["user_id", "username", "email", "password", "avatar", "visibility", "total_points"], user_rows)
+            counts["tiles"] += copy_rows(
+                TileInteraction, ["user_id", "grid_id", "position", "completed", "consent", "date_started",
+                                  "date_completed"], tile_rows)
+            copy_rows(GridProgress, ["user_id", "grid_id", "started_mask", "completed_mask"], progress_rows)
+
+        counts["friendships"] = copy_rows(
+            Friendship, ["requester_id", "receiver_id", "status"],
+            generate_friendships(random.Random(f"{random_seed}-friends"), user_ids, friends))
+
+        with connection.cursor() as cursor:
+            # The user ids were picked here, so move the sequence past them.
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User]):
+                cursor.execute(sql)
+            # Update the planner's statistics, which would otherwise describe the tables before seeding.
+            for model in (User, TileInteraction, GridProgress, Friendship):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+        leaderboard.rebuild()
+        grid_cache.invalidate()
+        response_cache.invalidate(response_cache.GRID)
+        username_index.invalidate()
+    return counts
@@ -0,0 +1,90 @@
+import statistics
+import sys
+import time
+from io import BytesIO
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+DEFAULT_POOL = {"min_size": 1, "max_size": 4}
+
+
+class Command(BaseCommand):
+    help = ("Measure the latency of requests to an API endpoint when opening a new database connection for each "
+            "request, when keeping persistent connections, and when using a connection pool.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="How many requests to time in each mode.")
+        parser.add_argument("--path", default=None, help="The path to request, the leaderboard by default.")
+        parser.add_argument("--host", default=None, help="The host to request, the first allowed host by default.")
+        parser.add_argument("--modes", nargs="+", default=["new", "persistent", "pool"],
+                            choices=["new", "persistent", "pool"])
+
+    def handle(self, *args, **options):
+        path = options["path"] or reverse("get_leaderboard")
+        host = options["host"] or next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        original_settings = {key: connection.settings_dict[key] for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS", "OPTIONS")}
+        pool_options = original_settings["OPTIONS"].get("pool") or DEFAULT_POOL
+
+        # Requests go through the WSGI handler, which opens and closes connections like a real server does.
+        handler = WSGIHandler()
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection)
+
+        connection_created.connect(count_connection)
+        try:
+            self.stdout.write(f"{'mode':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'connections':>13}")
+            for mode in options["modes"]:
+                self.use_mode(mode, original_settings, pool_options)
+                # Let the pool or persistent connection open before timing.
+                for _ in range(5):
+                    self.request(handler, path, host)
+                opened.clear()
+                timings = [self.request(handler, path, host) for _ in range(options["requests"])]
+                # Taking a connection from the pool also counts as connecting, so ask the pool how many it opened.
+                connections = connection.pool.get_stats()["connections_num"] if mode == "pool" else len(opened)
+                self.stdout.write(f"{mode:<12}{statistics.mean(timings):>10.2f}{statistics.median(timings):>10.2f}"
+                                  f"{statistics.quantiles(timings, n=20)[18]:>10.2f}{connections:>13}")
+        finally:
+            connection_created.disconnect(count_connection)
+            self.use_mode(None, original_settings, pool_options)
+
+    def use_mode(self, mode, original_settings, pool_options):
+        connection.close()
+        connection.close_pool()
+        connection.settings_dict.update(original_settings)
+        options = {key: value for key, value in original_settings["OPTIONS"].items() if key != "pool"}
+        if mode == "new":
+            connection.settings_dict.update(CONN_MAX_AGE=0, OPTIONS=options)
+        elif mode == "persistent":
+            connection.settings_dict.update(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True, OPTIONS=options)
+        elif mode == "pool":
+            connection.settings_dict.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=True,
+                                            OPTIONS={**options, "pool": pool_options})
+
+    def request(self, handler, path, host):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": host,
+            "SERVER_PORT": "80",
+            "HTTP_HOST": host,
+            "wsgi.input": BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+        }
+        statuses = []
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: statuses.append(status))
+        b"".join(response)
+        response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        if not statuses[0].startswith("200"):
+            raise CommandError(f"{path} responded with {statuses[0]}.")
+        return elapsed
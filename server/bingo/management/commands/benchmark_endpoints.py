@@ -0,0 +1,106 @@
+import json
+import shutil
+import subprocess
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from bingo import load_data
+from bingo.benchmarks import ENDPOINTS, Benchmark, private_caches
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway database with synthetic users, friendships and tiles, and measure the latency and "
+            "query counts of API endpoints with cold and warm caches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="How many users to seed.")
+        parser.add_argument("--friends", type=int, default=10, help="Roughly how many friends each user has.")
+        parser.add_argument("--tiles", type=int, default=6, help="Roughly how many tiles each user has started.")
+        parser.add_argument("--seed", type=int, default=0, help="The random seed of the data and requests.")
+        parser.add_argument("--requests", type=int, default=50, help="How many requests to time for each endpoint.")
+        parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+        parser.add_argument("--output", default=None, help="A file to save the results to as JSON.")
+        parser.add_argument("--baseline", default=None, help="A JSON file of earlier results to compare with.")
+        parser.add_argument("--keepdb", action="store_true",
+                            help="Keep the benchmark database, and reuse the data seeded in it by an earlier run.")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive",
+                            help="Don't ask before deleting an old benchmark database.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+
+        # The benchmark runs in a separate database, like the unit tests, so it can't change real data.
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=options["verbosity"], autoclobber=not options["interactive"],
+                                           keepdb=options["keepdb"])
+        # Uploads of completed challenges, and the caches, which are cleared and hold entries for the benchmark's
+        # data, are only kept until the benchmark finishes.
+        upload_dir = tempfile.mkdtemp()
+        cache_dir = tempfile.mkdtemp()
+        setup_test_environment(debug=False)
+        try:
+            with override_settings(TILE_UPLOAD_ROOT=upload_dir, MEDIA_ROOT=upload_dir, CACHES=private_caches(cache_dir)):
+                results = self.run(options)
+        finally:
+            teardown_test_environment()
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            connection.creation.destroy_test_db(old_name, verbosity=options["verbosity"], keepdb=options["keepdb"])
+
+        self.report(results, baseline)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}."))
+
+    def run(self, options):
+        if load_data.is_seeded():
+            self.stdout.write("Using the data seeded by an earlier run.")
+        else:
+            self.stdout.write(f"Seeding {options['users']} users...")
+            load_data.seed(users=options["users"], friends=options["friends"], tiles=options["tiles"],
+                           random_seed=options["seed"])
+        dataset = load_data.count()
+
+        try:
+            benchmark = Benchmark(requests=options["requests"], random_seed=options["seed"])
+        except ValueError as error:
+            raise CommandError(error)
+        endpoints = {}
+        for name in options["endpoints"]:
+            self.stdout.write(f"Benchmarking {name}...")
+            endpoints[name] = benchmark.run(name)
+        return {
+            "commit": self.get_commit(),
+            "created": timezone.now().isoformat(),
+            "settings": {"seed": options["seed"], "requests": options["requests"],
+                         "cache_backend": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+                         "postgres_connections": settings.POSTGRES_CONNECTIONS},
+            "dataset": dataset,
+            "endpoints": endpoints,
+        }
+
+    def get_commit(self):
+        try:
+            return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, results, baseline):
+        self.stdout.write(f"{'endpoint':<24}{'caches':<8}{'p50 ms':>10}{'p95 ms':>10}{'queries':>10}{'errors':>8}"
+                          + (f"{'p50 change':>12}" if baseline else ""))
+        for name, caches in results["endpoints"].items():
+            for state, result in caches.items():
+                line = (f"{name:<24}{state:<8}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                        f"{result['queries_mean']:>10.1f}{result['errors']:>8}")
+                previous = baseline and baseline["endpoints"].get(name, {}).get(state)
+                if previous:
+                    line += f"{(result['p50_ms'] / previous['p50_ms'] - 1) * 100:>+11.1f}%"
+                self.stdout.write(line)
@@ -0,0 +1,37 @@
+from django.apps import apps
+from django.contrib import admin
+from django.core.management.base import BaseCommand, CommandError
+from bingo.exports import start_export
+from bingo.models import ExportJob
+from bingo.tasks import run_export_job
+
+
+class Command(BaseCommand):
+    help = "Export every object of a model to a CSV file, in the same format as the admin's CSV export."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="The model to export, such as 'user' or 'tileinteraction'.")
+        parser.add_argument("--gzip", action="store_true", help="Compress the CSV file with gzip.")
+        parser.add_argument("--now", action="store_true",
+                            help="Write the file in this process, rather than queuing it for the django-q cluster.")
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model("bingo", options["model"])
+        except LookupError:
+            raise CommandError(f"There is no model named '{options['model']}'.")
+        if not admin.site.is_registered(model):
+            raise CommandError(f"Only models in the admin can be exported, which '{options['model']}' is not.")
+
+        job = start_export(model=model, compress=options["gzip"], queue=not options["now"])
+        if not options["now"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"Export #{job.pk} queued. It can be downloaded from the admin once it is done."))
+            return
+
+        run_export_job(job.pk, now=True)
+        job.refresh_from_db()
+        if job.status != ExportJob.DONE:
+            raise CommandError(f"Export #{job.pk} failed: {job.error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{job.rows_written} rows successfully exported to {job.file.path}."))
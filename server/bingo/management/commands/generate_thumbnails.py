@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from bingo.images import save_variants, variants_exist
+from bingo.models import TileInteraction
+
+
+class Command(BaseCommand):
+    help = "Save the smaller variants of tile images that don't have them yet, such as images uploaded before they were added."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Replace the variants of every image.")
+
+    def handle(self, *args, **options):
+        saved = 0
+        tiles = TileInteraction.objects.filter(image_status=TileInteraction.IMAGE_READY).exclude(image="")
+        for tile in tiles.only("pk", "image").iterator():
+            if not options["all"] and variants_exist(tile.image):
+                continue
+            try:
+                save_variants(tile.image)
+                saved += 1
+            except OSError as error:
+                self.stderr.write(f"Could not save the variants of tile {tile.pk}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Variants of {saved} images successfully saved."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from bingo import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Recount the leaderboard scores from the points of every user."
+
+    def handle(self, *args, **options):
+        leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            "Leaderboard successfully rebuilt."))
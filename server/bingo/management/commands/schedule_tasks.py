@@ -2,20 +2,27 @@ from django.core.management.base import BaseCommand
 from django_q.models import Schedule
 from django.utils import timezone
 
+SCHEDULES = [
+    # (name, task)
+    ("Delete inactive users", "bingo.tasks.delete_inactive"),
+    ("Sweep orphaned files", "bingo.tasks.sweep_orphan_files"),
+]
+
 
 class Command(BaseCommand):
-    help = "Schedule the task of deleting inactive users who have existed in the database for more than a day."
+    help = ("Schedule the daily tasks of deleting inactive users who have existed in the database for more than a day, "
+            "and of deleting image files that no tile refers to.")
 
     def handle(self, *args, **options):
-        task_name = "Delete inactive users"
-        if not Schedule.objects.filter(name=task_name).exists():
-            self.stdout.write("Schedule does not exist, making now")
-            Schedule.objects.create(
-                func='bingo.tasks.delete_inactive',
-                name=task_name,
-                schedule_type=Schedule.DAILY,
-                repeats=-1,
-                next_run=timezone.now(),
-            )
+        for task_name, func in SCHEDULES:
+            if not Schedule.objects.filter(name=task_name).exists():
+                self.stdout.write(f"Schedule '{task_name}' does not exist, making now")
+                Schedule.objects.create(
+                    func=func,
+                    name=task_name,
+                    schedule_type=Schedule.DAILY,
+                    repeats=-1,
+                    next_run=timezone.now(),
+                )
         self.stdout.write(self.style.SUCCESS(
-            "Task schedule successfully created."))
+            "Task schedules successfully created."))
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from bingo import load_data
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with synthetic users, friendships and tiles for load testing. "
+            "The same options always create the same data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100000, help="How many users to create.")
+        parser.add_argument("--friends", type=float, default=10, help="The mean number of friends of each user.")
+        parser.add_argument("--tiles", type=float, default=6, help="The mean number of tiles each user has started.")
+        parser.add_argument("--completion", type=float, default=0.6,
+                            help="The mean share of started tiles that have been completed.")
+        parser.add_argument("--seed", type=int, default=0, help="The random seed the data is generated from.")
+        parser.add_argument("--batch-size", type=int, default=load_data.BATCH_SIZE,
+                            help="How many users are generated and written at a time.")
+
+    def handle(self, *args, **options):
+        if load_data.is_seeded():
+            self.stdout.write(self.style.WARNING(
+                "Load testing data has already been seeded in this database, so no action was taken."))
+            return
+
+        start = time.perf_counter()
+        counts = load_data.seed(users=options["users"], friends=options["friends"], tiles=options["tiles"],
+                                completion=options["completion"], random_seed=options["seed"],
+                                batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['users']} users, {counts['friendships']} friendships and {counts['tiles']} tiles "
+            f"in {time.perf_counter() - start:.1f} seconds. Every user's password is {load_data.PASSWORD}."))
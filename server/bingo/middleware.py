@@ -0,0 +1,133 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from . import profiling, routers
+
+logger = logging.getLogger(__file__)
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Keeps a user's reads on the primary database for a while after they change something,
+    so that they don't read their old data from the replica.
+    """
+
+    def __init__(self, get_response):
+        routers.check_sticky_cache()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.REPLICA_DATABASE and request.method not in SAFE_METHODS and response.status_code < 400
+                and not getattr(request, 'read_only_view', False)):
+            # DRF sets the user it authenticated on the underlying request.
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                routers.mark_write(user)
+        return response
+
+
+class RequestTiming:
+    """
+    The queries made by a request, and when its view started and finished.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.view_end = None
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+class QueryTimingMiddleware:
+    """
+    Counts the database queries of each request and times them, the view, and the rendering of its response.
+    The timings are sent in a Server-Timing header and logged as JSON, and requests making more queries than
+    the budget of their route in QUERY_BUDGETS are logged as warnings. Only used when REQUEST_TIMING is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing.record_query))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        metrics = {"db": timing.db_time}
+        if timing.view_start is not None:
+            # Responses rendered by the handler (like DRF's) are rendered after the view returns.
+            view_end = timing.view_end or start + total
+            metrics["view"] = view_end - timing.view_start
+            if timing.view_end is not None:
+                metrics["render"] = start + total - timing.view_end
+        metrics["total"] = total
+        response["Server-Timing"] = ", ".join(
+            f'{name};dur={duration * 1000:.1f}' + (f';desc="{timing.queries} queries"' if name == "db" else "")
+            for name, duration in metrics.items())
+
+        route = request.resolver_match.url_name if request.resolver_match else None
+        budget = settings.QUERY_BUDGETS.get(route)
+        over_budget = budget is not None and timing.queries > budget
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": response.status_code,
+            "queries": timing.queries,
+            "query_budget": budget,
+            "over_budget": over_budget,
+            **{f"{name}_ms": round(duration * 1000, 2) for name, duration in metrics.items()},
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request.timing.view_end = time.perf_counter()
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the views of requests asking for it that are made by superusers. See `bingo.profiling`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not profiling.is_requested(request):
+            return None
+        user = profiling.get_superuser(request)
+        if user is None:
+            return None
+        response, profiler, duration_ms = profiling.profile(view_func, request, view_args, view_kwargs)
+        capture = profiling.save_capture(request, user, response, profiler, duration_ms)
+        response[profiling.CAPTURE_HEADER] = str(capture.pk)
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_scores(apps, schema_editor):
+    """
+    Fill the leaderboard with the current points of every ranked user.
+    """
+    User = apps.get_model("bingo", "User")
+    LeaderboardScore = apps.get_model("bingo", "LeaderboardScore")
+    counts = (
+        User.objects.filter(is_superuser=False, is_active=True)
+        .order_by()
+        .values("total_points")
+        .annotate(user_count=Count("pk"))
+    )
+    LeaderboardScore.objects.bulk_create(
+        LeaderboardScore(points=row["total_points"], user_count=row["user_count"])
+        for row in counts
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bingo", "0021_alter_user_visibility"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaderboardScore",
+            fields=[
+                ("points", models.IntegerField(primary_key=True, serialize=False)),
+                ("user_count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_scores, migrations.RunPython.noop),
+    ]
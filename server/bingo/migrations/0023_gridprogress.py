@@ -0,0 +1,82 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_progress(apps, schema_editor):
+    """
+    Create the started/completed bitmasks of every user and grid from their existing tiles.
+    """
+    TileInteraction = apps.get_model("bingo", "TileInteraction")
+    GridProgress = apps.get_model("bingo", "GridProgress")
+    masks = {}
+    tiles = TileInteraction.objects.values_list("user_id", "grid_id", "position", "completed")
+    for user_id, grid_id, position, completed in tiles.iterator():
+        started_mask, completed_mask = masks.get((user_id, grid_id), (0, 0))
+        bit = 1 << position
+        masks[(user_id, grid_id)] = (
+            started_mask | bit,
+            completed_mask | bit if completed else completed_mask,
+        )
+    GridProgress.objects.bulk_create(
+        (
+            GridProgress(
+                user_id=user_id,
+                grid_id=grid_id,
+                started_mask=started_mask,
+                completed_mask=completed_mask,
+            )
+            for (user_id, grid_id), (started_mask, completed_mask) in masks.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bingo", "0022_leaderboardscore"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GridProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_mask", models.BigIntegerField(default=0)),
+                ("completed_mask", models.BigIntegerField(default=0)),
+                (
+                    "grid",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="bingo.bingogrid",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "grid"), name="unique_user_grid_progress"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_progress, migrations.RunPython.noop),
+    ]
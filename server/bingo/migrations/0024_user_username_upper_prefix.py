@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:19
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("bingo", "0023_gridprogress"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("username"),
+                    name="text_pattern_ops",
+                ),
+                name="user_username_upper_prefix",
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:32
+
+import bingo.models
+import bingo.storage
+from django.db import migrations, models
+
+
+def mark_images_ready(apps, schema_editor):
+    """
+    Images uploaded before this migration were already processed during the request.
+    """
+    TileInteraction = apps.get_model("bingo", "TileInteraction")
+    TileInteraction.objects.exclude(image="").update(image_status="ready")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bingo", "0024_user_username_upper_prefix"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tileinteraction",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("none", "No image"),
+                    ("pending", "Processing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="none",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="tileinteraction",
+            name="raw_image",
+            field=models.FileField(
+                blank=True,
+                storage=bingo.storage.SettingStorage("TILE_UPLOAD_ROOT"),
+                upload_to="",
+                validators=[bingo.models.file_size],
+            ),
+        ),
+        migrations.RunPython(mark_images_ready, migrations.RunPython.noop),
+    ]
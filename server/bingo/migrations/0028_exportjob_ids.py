@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+def fail_unfinished_jobs(apps, schema_editor):
+    """
+    Unfinished exports of a selection only have its pickled query, which is being removed,
+    so they would export every object instead.
+    """
+    ExportJob = apps.get_model("bingo", "ExportJob")
+    ExportJob.objects.filter(status__in=["pending", "running"]).exclude(
+        query=None
+    ).update(
+        status="failed",
+        error="The export was stopped by an update. Please export the objects again.",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bingo", "0027_profilecapture"),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_unfinished_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="exportjob",
+            name="query",
+        ),
+        migrations.AddField(
+            model_name="exportjob",
+            name="bytes_written",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="exportjob",
+            name="ids",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="exportjob",
+            name="last_pk",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="exportjob",
+            name="parts_written",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bingo", "0028_exportjob_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="filters",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -4,8 +4,12 @@ from django.db import models
 from django.contrib.auth.models import PermissionsMixin, AbstractBaseUser, BaseUserManager
 from datetime import date
 from django.db.models import Q
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import OpClass
 from django.core.exceptions import ValidationError
 from sortedm2m.fields import SortedManyToManyField
+from .images import upload_storage
+from .storage import SettingStorage
 
 
 class UserManager(BaseUserManager):
@@ -99,12 +103,49 @@ class User(AbstractBaseUser, PermissionsMixin):
     def is_staff(self):
         return self.is_superuser
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the leaderboard entry the user was loaded with,
+        # so that it can be moved on save without re-reading the row.
+        if {"total_points", "is_active", "is_superuser"}.issubset(field_names):
+            instance._ranked_points = instance.get_ranked_points()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        if not self.get_deferred_fields() & {"total_points", "is_active", "is_superuser"}:
+            self._ranked_points = self.get_ranked_points()
+
+    def get_ranked_points(self):
+        """
+        Returns the points the user is ranked with on the leaderboard,
+        or None if they are not ranked (superusers and inactive users).
+        """
+        if not self.is_active or self.is_superuser:
+            return None
+        return self.total_points
+
     def __str__(self):
         return self.username
 
     class Meta:
         ordering = ["-total_points", "username"]
-        indexes = [models.Index(fields=["-total_points"])]
+        indexes = [
+            models.Index(fields=["-total_points"]),
+            # Lets case-insensitive prefix searches (username__istartswith) use an index scan.
+            models.Index(OpClass(Upper("username"), name="text_pattern_ops"), name="user_username_upper_prefix"),
+        ]
+
+
+class LeaderboardScore(models.Model):
+    # The number of ranked users on each distinct points total.
+    # This is kept up to date by bingo/leaderboard.py, so ranks can be found without scanning every user.
+    points = models.IntegerField(primary_key=True)
+    user_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_count} user(s) with {self.points} points"
 
 
 class Challenge(models.Model):
@@ -145,6 +186,14 @@ class Friendship(models.Model):
         default=PENDING
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the users the friendship was loaded with, so their cached friends
+        # can be invalidated if it is moved to other users.
+        instance._loaded_user_ids = (instance.__dict__.get("requester_id"), instance.__dict__.get("receiver_id"))
+        return instance
+
     class Meta:
         # Ensure the combination of requester and receiver is unique
         constraints = [
@@ -215,6 +264,29 @@ class TileInteraction(models.Model):
         keep_meta=False,
         validators=[file_size]
     )
+    # The image as it was uploaded, until it has been resized and stripped of metadata into `image`.
+    raw_image = models.FileField(
+        upload_to="",
+        storage=upload_storage,
+        blank=True,
+        validators=[file_size]
+    )
+
+    IMAGE_NONE = "none"
+    IMAGE_PENDING = "pending"
+    IMAGE_READY = "ready"
+    IMAGE_FAILED = "failed"
+    IMAGE_STATUS = [
+        (IMAGE_NONE, "No image"),
+        (IMAGE_PENDING, "Processing"),
+        (IMAGE_READY, "Ready"),
+        (IMAGE_FAILED, "Failed")
+    ]
+    image_status = models.CharField(
+        max_length=10,
+        choices=IMAGE_STATUS,
+        default=IMAGE_NONE
+    )
 
     completed = models.BooleanField(default=False)
     consent = models.BooleanField(default=False)
@@ -234,6 +306,25 @@ class TileInteraction(models.Model):
                 fields=['user', 'grid', 'position'], name='unique_user_grid_challenge')
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the name of the image the tile was loaded with, so that saving the tile
+        # can tell whether the image was replaced without loading it again.
+        if "image" in instance.__dict__:
+            instance._loaded_image = instance.__dict__["image"]
+        # Remember where the tile was loaded from, so that moving it can clear its old place in the user's progress.
+        if {"user_id", "grid_id", "position"}.issubset(instance.__dict__):
+            instance._loaded_tile = (instance.user_id, instance.grid_id, instance.position)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or "image" in fields:
+            self._loaded_image = self.image.name
+        if fields is None or {"user", "user_id", "grid", "grid_id", "position"} & set(fields):
+            self._loaded_tile = (self.user_id, self.grid_id, self.position)
+
     def get_image_html(self):
         if self.image:
             return mark_safe(f'<img src="{self.image.url}" width="100%" height="auto">')
@@ -242,3 +333,92 @@ class TileInteraction(models.Model):
     def __str__(self):
         return (f'Interaction of {self.user.username} with bingo grid '
                 f'{self.grid.grid_id} - Challenge in position {self.position} - Completed: {self.completed}')
+
+
+class GridProgress(models.Model):
+    # A compact record of a user's tiles in a bingo grid, kept up to date from their TileInteractions.
+    # Bit n of each mask is set when the tile in position n has been started/completed.
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    grid = models.ForeignKey(BingoGrid, on_delete=models.CASCADE)
+
+    started_mask = models.BigIntegerField(default=0)
+    completed_mask = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'grid'], name='unique_user_grid_progress')
+        ]
+
+    def __str__(self):
+        return (f'Progress of {self.user.username} in bingo grid {self.grid.grid_id} - '
+                f'Started: {self.started_mask:016b} - Completed: {self.completed_mask:016b}')
+
+
+class ExportJob(models.Model):
+    # A CSV export of a model, written in the background by the django-q cluster. Exports contain personal
+    # details, so they are kept in `EXPORT_ROOT`, outside `MEDIA_ROOT`, and only downloaded through the admin.
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed")
+    ]
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS,
+        default=PENDING
+    )
+
+    # The exported model, as "app_label.model_name".
+    model = models.CharField(max_length=100)
+    # The objects to export: those the admin's list shows with the query parameters in `filters` (its filters and
+    # search, as lists by name), or the sorted pks of the few objects selected on one of its pages, or every object.
+    filters = models.JSONField(null=True, blank=True)
+    ids = models.JSONField(null=True, blank=True)
+    compress = models.BooleanField(default=False)
+
+    file = models.FileField(upload_to="", storage=SettingStorage("EXPORT_ROOT"), blank=True)
+    rows_written = models.PositiveIntegerField(default=0)
+    # Where the file is up to: the pk of the last object written, the size of the unfinished file,
+    # and how many of the background tasks that each write part of it have finished.
+    last_pk = models.BigIntegerField(null=True, blank=True)
+    bytes_written = models.PositiveBigIntegerField(default=0)
+    parts_written = models.PositiveIntegerField(default=0)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Export #{self.pk} of {self.model} ({self.status.capitalize()})"
+
+
+class ProfileCapture(models.Model):
+    # The cProfile stats of a request, profiled at the request of a superuser, kept in `PROFILE_ROOT` and only
+    # downloaded through the admin.
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    # The name of the requested URL, if it has one.
+    route = models.CharField(max_length=100, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    file = models.FileField(upload_to="", storage=SettingStorage("PROFILE_ROOT"))
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Profile #{self.pk} of {self.method} {self.path}"
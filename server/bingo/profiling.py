@@ -0,0 +1,89 @@
+"""
+Profiling requests on demand, to find out why an endpoint is slow where it is slow.
+
+`ProfilingMiddleware` runs a view, and the rendering of its response, under cProfile when the request has an
+`X-Profile` header or a `profile` query parameter and is made by a superuser, logged in to the admin or
+sending an access token. The stats are saved as a `ProfileCapture` in `PROFILE_ROOT`, in the format of
+`cProfile.Profile.dump_stats`, so they can be downloaded from the admin and opened with `pstats` or snakeviz.
+Only the most recent `PROFILE_CAPTURES_KEPT` captures are kept. Other requests are only checked for the
+header and parameter, and anyone else asking for a profile gets the usual response.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import ProfileCapture
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAMETER = "profile"
+# The response header holding the id of the capture of a profiled request.
+CAPTURE_HEADER = "X-Profile-Capture"
+
+
+def is_requested(request):
+    return PROFILE_HEADER in request.META or PROFILE_PARAMETER in request.GET
+
+
+def get_superuser(request):
+    """
+    Returns the superuser making the request, or None if it isn't made by one.
+    """
+    # Users logged in to the admin are set by the authentication middleware, but API views authenticate
+    # their own users from access tokens.
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        user = authenticated[0] if authenticated else None
+    return user if user is not None and user.is_superuser else None
+
+
+def profile(view_func, request, view_args, view_kwargs):
+    """
+    Returns the view's response, rendered, with the profiler it was run under and how long it took in milliseconds.
+    """
+    def run():
+        response = view_func(request, *view_args, **view_kwargs)
+        # DRF's responses are rendered after the view returns, which is part of its time.
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    response = profiler.runcall(run)
+    return response, profiler, (time.perf_counter() - start) * 1000
+
+
+def save_capture(request, user, response, profiler, duration_ms):
+    route = (request.resolver_match.url_name if request.resolver_match else None) or ""
+    capture = ProfileCapture(method=request.method, path=request.get_full_path()[:255], route=route,
+                             status_code=response.status_code, duration_ms=duration_ms, created_by=user)
+    profiler.create_stats()
+    # The same format as `dump_stats`, without writing to a temporary file first.
+    capture.file.save(f"{timezone.now():%Y%m%d-%H%M%S}-{route or 'request'}.prof",
+                      ContentFile(marshal.dumps(profiler.stats)))
+
+    # Captures are deleted one at a time, so their files are deleted too.
+    for old_capture in ProfileCapture.objects.order_by('-created_at', '-pk')[settings.PROFILE_CAPTURES_KEPT:]:
+        old_capture.delete()
+    return capture
+
+
+def summarise(capture, limit=40):
+    """
+    Returns the functions of a capture that took the longest, including the functions they called, as text.
+    """
+    output = io.StringIO()
+    pstats.Stats(capture.file.path, stream=output).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return output.getvalue()
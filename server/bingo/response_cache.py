@@ -0,0 +1,138 @@
+"""
+Versions of what the grid, leaderboard and profile endpoints show, and a cache of their responses to
+anonymous users.
+
+Each version number is stored in the `RESPONSE_CACHE_ALIAS` cache, and the write paths bump it with
+`invalidate()` (see `bingo/signals.py`, `bingo/leaderboard.py` and `bingo/tasks.py`). Versions don't
+expire, so the ETags of the endpoints, which are made from them, only change when the data does. The
+cache must be shared by the server's processes, so they all use the same versions and see each other's
+changes; the default locmem cache is only right for a single process.
+
+With a read replica, a view could read the data from before a change that it has already got the new version
+of, and send or cache it under that version. Views call `read_fresh()` after getting their versions, which
+sends their reads to the primary database for `REPLICA_STICKY_SECONDS` after the versions change.
+
+Anonymous users all get the same response from the grid and leaderboard endpoints, so the response data
+is kept for `RESPONSE_CACHE_TIMEOUT` seconds under the current version. When the version is bumped,
+the next request builds a new response instead of clearing every cached response.
+"""
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import routers
+from .transactions import on_commit_batch
+from .views.utils import etag_matches, not_modified
+
+GRID = 'grid'
+LEADERBOARD = 'leaderboard'
+
+
+def profile(user_id):
+    return f'profile:{user_id}'
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(name):
+    return f'bingo:version:{name}'
+
+
+def _changed_key(name):
+    return f'bingo:version-changed:{name}'
+
+
+def get_version(name):
+    """
+    Returns the current version of what the named responses show.
+    """
+    key = _version_key(name)
+    version = _cache().get(key)
+    if version is None:
+        # Start from the time, so a version that was evicted from the cache isn't used again. Only the first
+        # process to add it succeeds, and the others read its version.
+        _cache().add(key, time.time_ns(), None)
+        version = _cache().get(key)
+    return version
+
+
+def _bump(name):
+    key = _version_key(name)
+    if settings.REPLICA_DATABASE:
+        # Marked before the version changes, so a view that gets the new version always sees the mark.
+        _cache().set(_changed_key(name), True, settings.REPLICA_STICKY_SECONDS)
+    try:
+        _cache().incr(key)
+    except ValueError:
+        # The version isn't cached, so the next request starts a new one.
+        return
+    # Backends without their own incr, such as the file cache, set the new version with the default timeout.
+    _cache().touch(key, None)
+
+
+def read_fresh(*names):
+    """
+    Sends the rest of a read-only view's reads to the primary database if any of the named versions changed
+    recently enough that the replica might not have caught up, so that the view can't read data older than the
+    versions it got. Must be called after getting the versions. Returns whether the reads were moved.
+    """
+    if not settings.REPLICA_DATABASE or not _cache().get_many([_changed_key(name) for name in names]):
+        return False
+    return routers.read_from_primary()
+
+
+class Invalidation:
+    """
+    The names of the responses to invalidate once a transaction (or savepoint) commits.
+    """
+
+    def __init__(self):
+        self.names = set()
+
+    def __call__(self):
+        for name in self.names:
+            _bump(name)
+
+
+def invalidate(name, using=None):
+    """
+    Moves the named responses to a new version now, and again once the current transaction commits,
+    so that a request can't cache the old response in between.
+    """
+    _bump(name)
+    # Every invalidation in the same savepoint is done by a single callback.
+    invalidation = on_commit_batch(Invalidation, using)
+    if invalidation is not None:
+        invalidation.names.add(name)
+
+
+def cache_anonymous_response(name):
+    """
+    Caches the data and ETag of a view's successful responses to anonymous users, under the current version of `name`.
+    Must be applied below `@api_view`, so that the user has been authenticated.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated or request.method != 'GET':
+                return view(request, *args, **kwargs)
+            key = f'bingo:response:{name}:{get_version(name)}'
+            read_fresh(name)
+            cached = _cache().get(key)
+            if cached is not None:
+                data, etag = cached
+                if etag and etag_matches(request, etag):
+                    return not_modified(etag)
+                return Response(data, status=status.HTTP_200_OK, headers={'ETag': etag} if etag else None)
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                _cache().set(key, (response.data, response.get('ETag')), settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
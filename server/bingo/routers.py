@@ -0,0 +1,109 @@
+"""
+Routing of the read-only views to a replica of the database.
+
+When `REPLICA_DATABASE` names a database, the queries made by views decorated with `read_only_view` are
+sent to it, and everything else keeps using the primary database. The replica lags a little behind the
+primary, so after a user changes something `ReplicaStickinessMiddleware` marks them in the
+`REPLICA_STICKY_CACHE_ALIAS` cache, and their reads stay on the primary for `REPLICA_STICKY_SECONDS`
+seconds, so they always see their own changes. Their next request may be handled by another server
+process, so the cache must be shared between processes, and the middleware refuses to start otherwise.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+# The database that reads are sent to, or None to use the primary database.
+_read_database = ContextVar('read_database', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Related objects are read from the same database as the object they belong to.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary database.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is migrated by replicating the primary database.
+        if settings.REPLICA_DATABASE and db == settings.REPLICA_DATABASE:
+            return False
+        return None
+
+
+def _cache():
+    return caches[settings.REPLICA_STICKY_CACHE_ALIAS]
+
+
+def _key(user_id):
+    return f'bingo:replica-sticky:{user_id}'
+
+
+def check_sticky_cache():
+    """
+    Raises ImproperlyConfigured if there is a replica, but users who change something can't be kept
+    on the primary database because the cache they are marked in isn't shared between processes.
+    """
+    if settings.REPLICA_DATABASE and isinstance(_cache(), (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f"The read replica needs REPLICA_STICKY_CACHE_ALIAS ('{settings.REPLICA_STICKY_CACHE_ALIAS}') to be a "
+            "cache shared between processes, such as CACHE_BACKEND=redis, so that users see their own changes.")
+
+
+def mark_write(user):
+    """
+    Sends the user's reads to the primary database for the next `REPLICA_STICKY_SECONDS` seconds.
+    """
+    _cache().set(_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def get_read_database(user):
+    """
+    Returns the database that a read-only view should read from for the user, or None for the primary database.
+    """
+    if not settings.REPLICA_DATABASE:
+        return None
+    if user.is_authenticated and _cache().get(_key(user.pk)):
+        return None
+    return settings.REPLICA_DATABASE
+
+
+def read_from_primary():
+    """
+    Sends the rest of the current read-only view's reads to the primary database.
+    Returns whether they were being sent to the replica.
+    """
+    if _read_database.get() is None:
+        return False
+    # The view's wrapper resets this once it returns.
+    _read_database.set(None)
+    return True
+
+
+def read_only_view(view):
+    """
+    Sends the queries of a view that doesn't change anything to the replica, if there is one.
+    Must be applied below `@api_view`, so that the user has been authenticated.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        # Tells `ReplicaStickinessMiddleware` not to treat a POST to this view as a change.
+        request._request.read_only_view = True
+        token = _read_database.set(get_read_database(request.user))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_database.reset(token)
+    return wrapper
@@ -0,0 +1,104 @@
+"""
+In-memory username index for type-ahead user search.
+
+The usernames of every searchable user (active non-superusers) are kept in a sorted list, so the users
+with a given prefix are found with a binary search instead of a database query. Each process builds its
+own index on first use and rebuilds it every `USER_SEARCH_INDEX_TIMEOUT` seconds, to pick up users added
+by other processes. Changes made in the same process are applied straight away from `bingo/signals.py`.
+
+This is only used when `USER_SEARCH_INDEX` is enabled, otherwise user search queries the database,
+where the `user_username_upper_prefix` index serves the same prefix lookups.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+
+from .models import User
+
+
+def _search_key(username):
+    # Matches the case-insensitive comparison used by `username__istartswith`.
+    return username.upper()
+
+
+class UsernameIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []
+        # Entries in the same order as their keys, as (username, user_id, avatar).
+        self._entries = []
+        self._keys_by_id = {}
+        self._expires = None
+
+    def rebuild(self):
+        """
+        Reloads every searchable user from the database.
+        """
+        users = (User.objects.filter(is_active=True, is_superuser=False)
+                 .order_by().values_list('username', 'user_id', 'avatar'))
+        rows = sorted(((_search_key(username), username), (username, user_id, avatar))
+                      for username, user_id, avatar in users.iterator())
+        with self._lock:
+            self._keys = [key for key, _ in rows]
+            self._entries = [entry for _, entry in rows]
+            self._keys_by_id = {entry[1]: key for key, entry in rows}
+            self._expires = time.monotonic() + settings.USER_SEARCH_INDEX_TIMEOUT
+
+    def invalidate(self):
+        with self._lock:
+            self._expires = None
+
+    @property
+    def is_built(self):
+        return self._expires is not None
+
+    def search(self, prefix, limit):
+        """
+        Returns up to `limit` users whose username starts with `prefix`, ignoring case,
+        as serialised by `UserSearchSerializer`.
+        """
+        expires = self._expires
+        if expires is None or time.monotonic() >= expires:
+            self.rebuild()
+        prefix = _search_key(prefix)
+        results = []
+        with self._lock:
+            index = bisect.bisect_left(self._keys, (prefix, ''))
+            while index < len(self._keys) and len(results) < limit and self._keys[index][0].startswith(prefix):
+                username, user_id, avatar = self._entries[index]
+                results.append({'avatar': avatar, 'username': username, 'user_id': user_id})
+                index += 1
+        return results
+
+    def _remove(self, user_id):
+        key = self._keys_by_id.pop(user_id, None)
+        if key is not None:
+            index = bisect.bisect_left(self._keys, key)
+            del self._keys[index]
+            del self._entries[index]
+
+    def update_user(self, user):
+        """
+        Adds, moves or removes a user that has been saved, if the index has been built.
+        """
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(user.user_id)
+            if user.is_active and not user.is_superuser:
+                key = (_search_key(user.username), user.username)
+                index = bisect.bisect_left(self._keys, key)
+                self._keys.insert(index, key)
+                self._entries.insert(index, (user.username, user.user_id, user.avatar))
+                self._keys_by_id[user.user_id] = key
+
+    def remove_user(self, user):
+        if not self.is_built:
+            return
+        with self._lock:
+            self._remove(user.user_id)
+
+
+username_index = UsernameIndex()
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from .images import variant_urls
 from .models import BingoGrid, Challenge, TileInteraction
 from datetime import date
 
@@ -57,9 +58,11 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
 
 class LeaderboardUserSerializer(serializers.ModelSerializer):
+    rank = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = User
-        fields = ['username', 'total_points', 'avatar']
+        fields = ['username', 'total_points', 'avatar', 'rank']
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
@@ -133,17 +136,25 @@ class ProfilePageChallengeSerializer(serializers.ModelSerializer):
 class ProfilePageTileSerializer(serializers.ModelSerializer):
     date_started = serializers.DateTimeField(format="%d/%m/%y %I:%M %p")
     date_completed = serializers.DateTimeField(format="%d/%m/%y %I:%M %p")
+    thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = TileInteraction
-        fields = ("image", "date_started", "date_completed",
+        fields = ("image", "thumbnails", "image_status", "date_started", "date_completed",
                   "completed", "description")
 
+    def get_thumbnails(self, obj):
+        # The URLs of the smaller variants of the image, once they have been saved.
+        if obj.image and obj.image_status == TileInteraction.IMAGE_READY:
+            return variant_urls(obj.image)
+        return None
+
     def to_representation(self, instance):
         # This ensures the field names match the TypeScript interface
         data = super().to_representation(instance)
         data["finishDate"] = data.pop("date_completed")
         data["startDate"] = data.pop("date_started")
+        data["imageStatus"] = data.pop("image_status")
         possibly_blank_description = data.pop("description")
         if possibly_blank_description:
             data["imageDescription"] = possibly_blank_description
@@ -209,5 +220,6 @@ class FriendshipUserSerializer(serializers.ModelSerializer):
         fields = ['userId', 'userName', 'avatar', 'friendship_id']
 
     def get_friendship_id(self, obj):
-        friendship = self.context.get('friendship')
+        # Either a single friendship, or a dictionary of friendships by user id when serializing many users.
+        friendship = self.context.get('friendship') or self.context.get('friendships', {}).get(obj.pk)
         return friendship.id if friendship else None
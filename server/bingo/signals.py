@@ -1,7 +1,13 @@
-from .models import TileInteraction
-import os
+from .models import BingoGrid, Challenge, ExportJob, Friendship, ProfileCapture, TileInteraction, User
+from . import engine, friend_cache, grid_cache, leaderboard, response_cache
+from .file_cleanup import delete_later
+from .images import get_image_names, save_variants
+from .search import username_index
 from django.dispatch import receiver
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+# Fields of a user shown on the leaderboard, or deciding whether they are ranked.
+LEADERBOARD_FIELDS = {'username', 'avatar', 'total_points', 'is_active', 'is_superuser'}
 
 # modified from https://stackoverflow.com/a/16041527
 
@@ -10,29 +16,160 @@ from django.db.models.signals import post_delete, pre_save
 def auto_delete_file_on_delete(sender, instance, **kwargs):
     """
     Deletes file from filesystem
-    when corresponding `TileInteraction` object is deleted.
+    when corresponding `TileInteraction` object is deleted,
+    once the deletion has been committed.
     """
     if instance.image:
-        if os.path.isfile(instance.image.path):
-            os.remove(instance.image.path)
+        delete_later("media", get_image_names(instance.image.name))
+    if instance.raw_image:
+        delete_later("uploads", [instance.raw_image.name])
 
 
 @receiver(pre_save, sender=TileInteraction)
-def auto_delete_file_on_change(sender, instance, **kwargs):
+def auto_delete_file_on_change(sender, instance, update_fields=None, **kwargs):
     """
     Deletes old file from filesystem
     when corresponding `TileInteraction` object is updated
-    with new file.
+    with new file, once the update has been committed.
     """
-    if not instance.pk:
+    if not instance.pk or (update_fields is not None and 'image' not in update_fields):
         return False
 
-    try:
-        old_image = TileInteraction.objects.get(pk=instance.pk).image
-    except TileInteraction.DoesNotExist:
-        return False
+    if hasattr(instance, '_loaded_image'):
+        old_name = instance._loaded_image
+    else:
+        # The tile wasn't loaded from the database, or was loaded without its image.
+        old_name = TileInteraction.objects.filter(pk=instance.pk).values_list('image', flat=True).first()
 
     new_image = instance.image
-    if old_image and not old_image == new_image:
-        if os.path.isfile(old_image.path):
-            os.remove(old_image.path)
+    # A new upload is only given its final name when it is saved, which may match the old name.
+    replaced = new_image.name != old_name or not new_image._committed
+    if old_name and replaced:
+        delete_later("media", get_image_names(old_name))
+    # An image set directly, such as from the admin, is already resized but has no variants yet.
+    instance._image_replaced = bool(new_image) and replaced
+    if instance._image_replaced:
+        instance.image_status = TileInteraction.IMAGE_READY
+
+
+@receiver(post_save, sender=TileInteraction)
+def save_variants_on_change(sender, instance, raw, **kwargs):
+    """
+    Saves the smaller variants of an image set directly on a tile,
+    and remembers the saved image for the next time the tile changes.
+    """
+    if not raw and getattr(instance, '_image_replaced', False):
+        save_variants(instance.image)
+        instance._image_replaced = False
+    if kwargs['update_fields'] is None or 'image' in kwargs['update_fields']:
+        instance._loaded_image = instance.image.name
+
+
+@receiver(post_save, sender=User)
+def update_leaderboard_on_save(sender, instance, created, raw, update_fields=None, **kwargs):
+    """
+    Moves the user to their new score on the leaderboard
+    when their points or ranking eligibility change,
+    and updates them in this process's username search index.
+    The cached leaderboard responses are invalidated, unless only fields they don't show changed.
+    """
+    if raw:
+        return
+    leaderboard.sync_user(instance, created)
+    username_index.update_user(instance)
+    if update_fields is None or LEADERBOARD_FIELDS.intersection(update_fields):
+        response_cache.invalidate(response_cache.LEADERBOARD)
+    response_cache.invalidate(response_cache.profile(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def update_leaderboard_on_delete(sender, instance, **kwargs):
+    """
+    Removes the user from the leaderboard and the username search index
+    when they are deleted.
+    """
+    leaderboard.move(getattr(instance, '_ranked_points', instance.get_ranked_points()), None)
+    username_index.remove_user(instance)
+    response_cache.invalidate(response_cache.LEADERBOARD)
+
+
+@receiver(post_save, sender=BingoGrid)
+@receiver(post_delete, sender=BingoGrid)
+@receiver(m2m_changed, sender=BingoGrid.challenges.through)
+def invalidate_grid_cache_on_grid_change(sender, **kwargs):
+    """
+    Drops the cached active grid and grid responses when a grid or its challenges change.
+    """
+    grid_cache.invalidate()
+    response_cache.invalidate(response_cache.GRID)
+
+
+@receiver(post_save, sender=Challenge)
+@receiver(post_delete, sender=Challenge)
+def invalidate_grid_cache_on_challenge_change(sender, update_fields=None, **kwargs):
+    """
+    Drops the cached active grid and grid responses when a challenge is edited,
+    unless only its completion count changed.
+    """
+    if update_fields is not None and set(update_fields) == {'total_completions'}:
+        return
+    grid_cache.invalidate()
+    response_cache.invalidate(response_cache.GRID)
+
+
+@receiver(post_save, sender=TileInteraction)
+def update_grid_progress_on_save(sender, instance, raw, **kwargs):
+    """
+    Records the tile's state in the user's `GridProgress` bitmasks, clearing its old place if it was moved
+    to another user, grid or position, and invalidates their profile responses.
+    """
+    if raw:
+        return
+    place = (instance.user_id, instance.grid_id, instance.position)
+    loaded = getattr(instance, '_loaded_tile', None)
+    if loaded is not None and loaded != place:
+        user_id, grid_id, position = loaded
+        engine.forget_tile(TileInteraction(user_id=user_id, grid_id=grid_id, position=position))
+        response_cache.invalidate(response_cache.profile(user_id))
+    engine.record_tile(instance)
+    instance._loaded_tile = place
+    response_cache.invalidate(response_cache.profile(instance.user_id))
+
+
+@receiver(post_delete, sender=TileInteraction)
+def update_grid_progress_on_delete(sender, instance, **kwargs):
+    """
+    Removes the tile from the user's `GridProgress` bitmasks,
+    and invalidates their profile responses.
+    """
+    engine.forget_tile(instance)
+    response_cache.invalidate(response_cache.profile(instance.user_id))
+
+
+@receiver(post_save, sender=Friendship)
+@receiver(post_delete, sender=Friendship)
+def invalidate_friend_cache(sender, instance, **kwargs):
+    """
+    Drops the cached friends of both users in a friendship when it changes,
+    including the users it was loaded with if it was moved to other users.
+    """
+    user_ids = {instance.requester_id, instance.receiver_id, *getattr(instance, '_loaded_user_ids', ())}
+    friend_cache.invalidate(*(user_id for user_id in user_ids if user_id is not None))
+
+
+@receiver(post_delete, sender=ExportJob)
+def delete_export_file(sender, instance, **kwargs):
+    """
+    Deletes the CSV file of an export job once its deletion has been committed.
+    """
+    if instance.file:
+        delete_later("exports", [instance.file.name])
+
+
+@receiver(post_delete, sender=ProfileCapture)
+def delete_profile_file(sender, instance, **kwargs):
+    """
+    Deletes the stats file of a profile once its deletion has been committed.
+    """
+    if instance.file:
+        delete_later("profiles", [instance.file.name])
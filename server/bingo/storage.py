@@ -0,0 +1,31 @@
+"""
+Storage of the files the server writes outside `MEDIA_ROOT`, which are never served directly.
+
+Each `SettingStorage` is located at the directory held by a setting, such as `TILE_UPLOAD_ROOT`,
+`EXPORT_ROOT` or `PROFILE_ROOT`. The setting is read whenever the storage is used, rather than when
+it is created, so tests can move it with `override_settings`.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class SettingStorage(FileSystemStorage):
+    """
+    Storage located at the directory held by the setting named `setting_name`.
+    """
+
+    def __init__(self, setting_name, **kwargs):
+        self.setting_name = setting_name
+        super().__init__(**kwargs)
+
+    @property
+    def base_location(self):
+        return getattr(settings, self.setting_name)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
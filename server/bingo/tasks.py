@@ -1,16 +1,164 @@
-from .models import User
+from . import response_cache
+from .exports import write_export
+from .file_cleanup import STORAGES, TILE_STORAGES
+from .images import delete_variants, get_image_names, save_variants
+from .models import ExportJob, User, TileInteraction
 from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
+from django_q.tasks import async_task
 import logging
+import os
+import time
 
 logger = logging.getLogger(__file__)
 
 
 def delete_inactive():
+    """
+    Deletes users who haven't activated their account within a day of registering.
+
+    Users are deleted `INACTIVE_PURGE_BATCH_SIZE` at a time, each batch in its own transaction, so that
+    their friendships and tiles are never all loaded at once. After `INACTIVE_PURGE_TIME_LIMIT` seconds
+    the task queues itself again to delete the rest, rather than being stopped by the cluster's timeout.
+    If it is stopped anyway, the batches deleted so far stay deleted and the next run carries on.
+    """
     to_delete = User.objects.filter(is_active=False, created_at__lte=(
         timezone.now() - timedelta(days=1)))
-    if to_delete.exists():
-        deleted_count, _ = to_delete.delete()
-        logger.info(f"{deleted_count} inactive users deleted.")
+    started = time.monotonic()
+    deleted_users = deleted_rows = 0
+    while True:
+        batch = list(to_delete.order_by("pk").values_list("pk", flat=True)[:settings.INACTIVE_PURGE_BATCH_SIZE])
+        if not batch:
+            break
+        # The batch is filtered again, so users who activated their account since it was listed are kept.
+        with transaction.atomic():
+            rows, per_model = to_delete.filter(pk__in=batch).delete()
+        deleted_users += per_model.get(User._meta.label, 0)
+        deleted_rows += rows
+        elapsed = time.monotonic() - started
+        logger.info(f"{deleted_users} inactive users deleted so far, with {deleted_rows} rows "
+                    f"({deleted_rows / max(elapsed, 0.001):.0f} rows/sec).")
+        if elapsed >= settings.INACTIVE_PURGE_TIME_LIMIT:
+            logger.info("Time limit reached, queuing the deletion of the remaining inactive users.")
+            async_task("bingo.tasks.delete_inactive")
+            return
+
+    if deleted_users:
+        logger.info(f"{deleted_users} inactive users deleted.")
     else:
         logger.info("There are currently no inactive users.")
+
+
+def delete_files(files):
+    """
+    Deletes files queued by `bingo.file_cleanup.delete_later`, given as [storage name, file name] pairs.
+    """
+    for storage_name, name in files:
+        STORAGES[storage_name].delete(name)
+    logger.info(f"{len(files)} files deleted.")
+
+
+def sweep_orphan_files():
+    """
+    Deletes the files in `MEDIA_ROOT` and `TILE_UPLOAD_ROOT` that no tile refers to,
+    unless they are newer than `ORPHAN_FILE_MIN_AGE`.
+    """
+    referenced = {storage_name: set() for storage_name in TILE_STORAGES}
+    tiles = TileInteraction.objects.exclude(image="", raw_image="").values_list("image", "raw_image")
+    for image, raw_image in tiles.iterator():
+        if image:
+            referenced["media"].update(get_image_names(image))
+        if raw_image:
+            referenced["uploads"].add(raw_image)
+
+    cutoff = time.time() - settings.ORPHAN_FILE_MIN_AGE
+    orphans = []
+    for storage_name in TILE_STORAGES:
+        storage = STORAGES[storage_name]
+        for directory, _, file_names in os.walk(storage.location):
+            for file_name in file_names:
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+                if name not in referenced[storage_name] and os.path.getmtime(path) < cutoff:
+                    orphans.append([storage_name, name])
+    delete_files(orphans)
+
+
+def queue_tile_image(tile):
+    """
+    Processes the raw image of a tile in the django-q cluster once the current transaction commits,
+    or straight away if `TILE_IMAGE_ASYNC` is disabled. Returns the tile's image status afterwards.
+    """
+    if settings.TILE_IMAGE_ASYNC:
+        transaction.on_commit(lambda: async_task(process_tile_image, tile.pk, group="tile-images"))
+        return TileInteraction.IMAGE_PENDING
+    # The image is left pending if another request replaced it first.
+    return process_tile_image(tile.pk) or TileInteraction.IMAGE_PENDING
+
+
+def process_tile_image(tile_id):
+    """
+    Saves a resized copy of the raw image of a tile, without its metadata, and deletes the raw image.
+    Returns the tile's new image status, or None if it wasn't processed by this task.
+    """
+    try:
+        tile = TileInteraction.objects.get(pk=tile_id)
+    except TileInteraction.DoesNotExist:
+        logger.info(f"Tile {tile_id} was deleted before its image was processed.")
+        return
+    raw_image = tile.raw_image
+    if not raw_image:
+        return
+
+    try:
+        # The `ResizedImageField` resizes the image and drops its metadata as it is saved.
+        with raw_image.open("rb"):
+            tile.image.save(os.path.basename(raw_image.name), raw_image, save=False)
+        save_variants(tile.image)
+        image_status = TileInteraction.IMAGE_READY
+    except Exception:
+        logger.exception(f"Could not process the image of tile {tile_id}.")
+        if tile.image:
+            delete_variants(tile.image)
+            tile.image.storage.delete(tile.image.name)
+        tile.image = ""
+        image_status = TileInteraction.IMAGE_FAILED
+
+    # Only update the tile if it still holds the same raw image, so a repeated task can't overwrite newer images.
+    updated = TileInteraction.objects.filter(pk=tile_id, raw_image=raw_image.name).update(
+        image=tile.image.name, raw_image="", image_status=image_status)
+    if updated:
+        raw_image.storage.delete(raw_image.name)
+        response_cache.invalidate(response_cache.profile(tile.user_id))
+        return image_status
+    if tile.image:
+        delete_variants(tile.image)
+        tile.image.storage.delete(tile.image.name)
+    return None
+
+
+def run_export_job(job_id, part=0, now=False):
+    """
+    Writes the CSV file of an export job, marking the job as failed if it can't be written.
+
+    Each run writes for `EXPORT_TIME_LIMIT` seconds and queues the next part, so the other tasks aren't held up
+    by a large export, and no run lasts long enough for the cluster to hand it out again. A part that is
+    stopped is retried from the last chunk it recorded. With `now`, the whole file is written in this process.
+    """
+    # Only the queued part is run, so a part handed out again after it finished does nothing.
+    if not ExportJob.objects.filter(pk=job_id, status__in=[ExportJob.PENDING, ExportJob.RUNNING],
+                                    parts_written=part).update(status=ExportJob.RUNNING):
+        logger.info(f"Export job {job_id} was deleted or part {part} has already been run.")
+        return
+    try:
+        finished = write_export(ExportJob.objects.get(pk=job_id), time_limit=None if now else settings.EXPORT_TIME_LIMIT)
+    except Exception as error:
+        logger.exception(f"Export job {job_id} failed.")
+        ExportJob.objects.filter(pk=job_id).update(
+            status=ExportJob.FAILED, error=str(error), finished_at=timezone.now())
+        return
+    if not finished:
+        ExportJob.objects.filter(pk=job_id).update(parts_written=part + 1)
+        async_task("bingo.tasks.run_export_job", job_id, part + 1, group="exports")
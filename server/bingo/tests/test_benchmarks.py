@@ -0,0 +1,42 @@
+import shutil
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from .. import load_data
+from ..benchmarks import ENDPOINTS, Benchmark, clear_caches, private_caches
+
+TEST_DIR = 'test_data'
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR + '/media', TILE_UPLOAD_ROOT=TEST_DIR + '/uploads')
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        self.counts = load_data.seed(users=60, friends=4, tiles=6, random_seed=1, batch_size=25)
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    def test_benchmark_endpoints(self):
+        benchmark = Benchmark(requests=3)
+        for name in ENDPOINTS:
+            results = benchmark.run(name)
+            for state in ('cold', 'warm'):
+                self.assertEqual(results[state]['requests'], 3)
+                self.assertEqual(results[state]['errors'], 0, name)
+                self.assertGreater(results[state]['queries_max'], 0)
+                self.assertLessEqual(results[state]['p50_ms'], results[state]['p95_ms'])
+        # Completed challenges are rolled back.
+        self.assertEqual(load_data.count(), self.counts)
+
+    @override_settings(CACHES={**settings.CACHES, "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": TEST_DIR + "/cache"}})
+    def test_server_caches_untouched(self):
+        caches["shared"].set("key", "server")
+        server_default = settings.CACHES["default"]
+        with override_settings(CACHES=private_caches(TEST_DIR + "/benchmark")):
+            # Caches in the memory of each process are kept.
+            self.assertEqual(settings.CACHES["default"], server_default)
+            self.assertEqual(settings.CACHES["shared"]["LOCATION"], TEST_DIR + "/benchmark/shared")
+            caches["shared"].set("key", "benchmark")
+            clear_caches()
+        self.assertEqual(caches["shared"].get("key"), "server")
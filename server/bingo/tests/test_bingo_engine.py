@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+from ..models import User, BingoGrid, GridProgress, TileInteraction
+from ..engine import find_bingos, get_line_masks, get_progress
+
+
+def mask_of(*positions):
+    return sum(1 << position for position in positions)
+
+
+class LineMaskTest(SimpleTestCase):
+    def test_4x4_masks(self):
+        lines = get_line_masks(4)
+        self.assertEqual(lines.rows[1], mask_of(4, 5, 6, 7))
+        self.assertEqual(lines.cols[2], mask_of(2, 6, 10, 14))
+        self.assertEqual(lines.diag, mask_of(0, 5, 10, 15))
+        self.assertEqual(lines.anti_diag, mask_of(3, 6, 9, 12))
+        self.assertEqual(lines.full, 0xFFFF)
+
+    def test_other_widths(self):
+        lines = get_line_masks(3)
+        self.assertEqual(lines.rows[2], mask_of(6, 7, 8))
+        self.assertEqual(lines.anti_diag, mask_of(2, 4, 6))
+        self.assertEqual(lines.full, 0b111111111)
+
+    def test_no_bingo(self):
+        self.assertEqual(find_bingos(mask_of(0, 1, 2), 2), {
+            'bingo_row': -1, 'bingo_col': -1, 'bingo_diag': -1, 'full_bingo': False, 'bingo_points': 0})
+
+    def test_triple_bingo(self):
+        completed = mask_of(4, 5, 6, 7, 2, 10, 14, 3, 9, 12)
+        self.assertEqual(find_bingos(completed, 6), {
+            'bingo_row': 1, 'bingo_col': 2, 'bingo_diag': 3, 'full_bingo': False,
+            'bingo_points': 3 * settings.BINGO_COMPLETE})
+
+    def test_full_bingo(self):
+        bingos = find_bingos(0xFFFF, 15)
+        self.assertEqual((bingos['bingo_row'], bingos['bingo_col'], bingos['bingo_diag']), (3, 3, 0))
+        self.assertTrue(bingos['full_bingo'])
+        self.assertEqual(bingos['bingo_points'], 3 * settings.BINGO_COMPLETE + settings.GRID_COMPLETE)
+
+
+class GridProgressTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="password123")
+        self.grid = BingoGrid.objects.create(is_active=True)
+
+    def get_masks(self):
+        progress = get_progress(self.user.pk, self.grid.pk)
+        return progress.started_mask, progress.completed_mask
+
+    def test_no_progress(self):
+        self.assertEqual(self.get_masks(), (0, 0))
+        self.assertFalse(GridProgress.objects.exists())
+
+    def test_tiles_recorded(self):
+        TileInteraction.objects.create(user=self.user, grid=self.grid, position=3)
+        tile = TileInteraction.objects.create(user=self.user, grid=self.grid, position=7, completed=True)
+        self.assertEqual(self.get_masks(), (mask_of(3, 7), mask_of(7)))
+
+        tile.completed = False
+        tile.save()
+        self.assertEqual(self.get_masks(), (mask_of(3, 7), 0))
+
+    def test_tile_deleted(self):
+        tile = TileInteraction.objects.create(user=self.user, grid=self.grid, position=15, completed=True)
+        TileInteraction.objects.create(user=self.user, grid=self.grid, position=0)
+        tile.delete()
+        self.assertEqual(self.get_masks(), (mask_of(0), 0))
+
+    def test_tile_moved(self):
+        created = TileInteraction.objects.create(user=self.user, grid=self.grid, position=5, completed=True)
+        created.position = 6
+        created.save()
+        self.assertEqual(self.get_masks(), (mask_of(6), mask_of(6)))
+
+        # Moved to another user and grid, as the admin can, after being loaded.
+        other_user = User.objects.create_user(username="other", email="other@example.com", password="password123")
+        other_grid = BingoGrid.objects.create()
+        tile = TileInteraction.objects.get(pk=created.pk)
+        tile.user = other_user
+        tile.grid = other_grid
+        tile.save()
+        self.assertEqual(self.get_masks(), (0, 0))
+        progress = get_progress(other_user.pk, other_grid.pk)
+        self.assertEqual((progress.started_mask, progress.completed_mask), (mask_of(6), mask_of(6)))
@@ -1,5 +1,8 @@
 from django.test import TestCase
 from ..models import User, Challenge, TileInteraction, BingoGrid
+from ..images import variant_name
+from ..response_cache import Invalidation
+from ..tasks import process_tile_image
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -9,12 +12,13 @@ from PIL import Image
 from io import BytesIO
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import override_settings
+import os
 import shutil
 
 TEST_DIR = 'test_data'
 
 
-@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'))
+@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'), TILE_UPLOAD_ROOT=(TEST_DIR + '/uploads'))
 class ChallengeCompleteTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -308,6 +312,63 @@ class ChallengeCompleteTest(TestCase):
         self.tiles[6].refresh_from_db()
         self.assertTrue(self.tiles[6].consent)
 
+    def test_image_processed_in_background(self):
+        data = {
+            "position": 2,
+            "consent": True,
+            "image": self.image
+        }
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch(self.url, data, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["image_status"], TileInteraction.IMAGE_PENDING)
+        self.assertEqual(len([callback for callback in callbacks if not isinstance(callback, Invalidation)]), 1)
+        tile = TileInteraction.objects.get(pk=self.tiles[2].pk)
+        self.assertFalse(tile.image)
+        raw_path = tile.raw_image.path
+        self.assertTrue(os.path.isfile(raw_path))
+
+        process_tile_image(tile.pk)
+
+        tile.refresh_from_db()
+        self.assertEqual(tile.image_status, TileInteraction.IMAGE_READY)
+        self.assertTrue(os.path.isfile(tile.image.path))
+        self.assertFalse(tile.raw_image)
+        self.assertFalse(os.path.isfile(raw_path))
+
+        variant_paths = [tile.image.storage.path(variant_name(tile.image.name, variant))
+                         for variant in settings.TILE_IMAGE_VARIANTS]
+        for path, size in zip(variant_paths, settings.TILE_IMAGE_VARIANTS.values()):
+            with Image.open(path) as variant:
+                self.assertEqual(variant.format, "WEBP")
+                self.assertLessEqual(max(variant.size), size)
+
+        # The image and its variants are removed once the tile's deletion commits.
+        with self.settings(FILE_CLEANUP_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            tile.delete()
+        self.assertFalse(any(os.path.isfile(path) for path in variant_paths + [tile.image.path]))
+
+    @override_settings(TILE_IMAGE_ASYNC=False)
+    def test_image_processed_in_request(self):
+        response = self.client.patch(self.url, {"position": 2, "consent": True, "image": self.image}, format="multipart")
+        self.assertEqual(response.data["image_status"], TileInteraction.IMAGE_READY)
+        self.assertEqual(TileInteraction.objects.get(pk=self.tiles[2].pk).image_status, TileInteraction.IMAGE_READY)
+
+    def test_invalid_image_fails_processing(self):
+        tile = self.tiles[3]
+        tile.raw_image = SimpleUploadedFile("broken.png", b"not an image", content_type="image/png")
+        tile.image_status = TileInteraction.IMAGE_PENDING
+        tile.save()
+
+        with self.assertLogs(level="ERROR"):
+            process_tile_image(tile.pk)
+
+        tile.refresh_from_db()
+        self.assertEqual(tile.image_status, TileInteraction.IMAGE_FAILED)
+        self.assertFalse(tile.image)
+        self.assertFalse(tile.raw_image)
+
     def tearDown(self):
         try:
             shutil.rmtree(TEST_DIR)
@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from PIL import Image
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from ..models import User, Challenge, TileInteraction, BingoGrid, LeaderboardScore
+import shutil
+
+TEST_DIR = 'test_data'
+
+
+def make_image():
+    img = Image.new("RGB", (10, 10), color="red")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return SimpleUploadedFile("test_image.png", buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'), TILE_UPLOAD_ROOT=(TEST_DIR + '/uploads'))
+class ConcurrentChallengeCompleteTest(TransactionTestCase):
+    """
+    Fires completions in parallel threads, each with its own database connection,
+    and checks that no points or completions are lost.
+    """
+
+    def setUp(self):
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.challenges = [Challenge.objects.create(name=f"Challenge {i}", challenge_type="act", points=5)
+                           for i in range(16)]
+        self.grid.challenges.add(*self.challenges)
+
+    def complete(self, user, position):
+        client = APIClient()
+        try:
+            # Like a real request, each thread loads its own copy of the user.
+            client.force_authenticate(user=User.objects.get(pk=user.pk))
+            return client.patch(reverse("complete_challenge"),
+                                {"position": position, "consent": True, "image": make_image()}, format="multipart")
+        finally:
+            connection.close()
+
+    def run_in_parallel(self, calls):
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = [executor.submit(self.complete, *call) for call in calls]
+            return [future.result() for future in futures]
+
+    def test_many_users_same_challenge(self):
+        users = []
+        for i in range(10):
+            user = User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com", password="password")
+            TileInteraction.objects.create(user=user, grid=self.grid, position=0)
+            users.append(user)
+
+        responses = self.run_in_parallel([(user, 0) for user in users])
+
+        self.assertTrue(all(response.status_code == status.HTTP_200_OK for response in responses))
+        self.challenges[0].refresh_from_db()
+        self.assertEqual(self.challenges[0].total_completions, 10)
+        self.assertEqual(set(User.objects.values_list("total_points", flat=True)), {5})
+        self.assertEqual(LeaderboardScore.objects.get(points=5).user_count, 10)
+
+    def test_one_user_whole_grid(self):
+        user = User.objects.create_user(username="user", email="user@example.com", password="password")
+        for i in range(16):
+            TileInteraction.objects.create(user=user, grid=self.grid, position=i)
+
+        responses = self.run_in_parallel([(user, i) for i in range(16)])
+
+        self.assertTrue(all(response.status_code == status.HTTP_200_OK for response in responses))
+        # Each line must be awarded exactly once, by whichever request completed it last.
+        self.assertEqual(sum(response.data["full_bingo"] for response in responses), 1)
+        expected_points = 16 * 5 + 10 * settings.BINGO_COMPLETE + settings.GRID_COMPLETE
+        self.assertEqual(sum(response.data["challenge_points"] + response.data["bingo_points"]
+                             for response in responses), expected_points)
+        user.refresh_from_db()
+        self.assertEqual(user.total_points, expected_points)
+        self.assertEqual(dict(LeaderboardScore.objects.filter(user_count__gt=0).values_list("points", "user_count")),
+                         {expected_points: 1})
+
+    def test_same_tile_twice(self):
+        user = User.objects.create_user(username="user", email="user@example.com", password="password")
+        TileInteraction.objects.create(user=user, grid=self.grid, position=3)
+
+        responses = self.run_in_parallel([(user, 3)] * 4)
+
+        self.assertEqual(sorted(response.status_code for response in responses),
+                         [status.HTTP_200_OK] + 3 * [status.HTTP_409_CONFLICT])
+        user.refresh_from_db()
+        self.assertEqual(user.total_points, 5)
+        self.challenges[3].refresh_from_db()
+        self.assertEqual(self.challenges[3].total_completions, 1)
+
+    def tearDown(self):
+        try:
+            shutil.rmtree(TEST_DIR)
+        except OSError:
+            pass
@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from .. import leaderboard
+from ..models import BingoGrid, Challenge, Friendship, TileInteraction, User
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.challenges = [Challenge.objects.create(name=f"Challenge {i}", description="Description",
+                                                    challenge_type="act", points=5) for i in range(16)]
+        self.grid.challenges.add(*self.challenges)
+        self.user1 = User.objects.create_user(username="user1", email="user1@example.com", password="password123")
+        self.user2 = User.objects.create_user(username="user2", email="user2@example.com", password="password123",
+                                              visibility=1)
+
+    def assertNotModified(self, url, response):
+        """
+        Requests the url again with the ETag of the response, and checks that it wasn't resent.
+        """
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        repeat = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(repeat['ETag'], etag)
+        self.assertFalse(repeat.content)
+        return etag
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_anonymous_grid(self):
+        url = reverse('get_bingo_grid')
+        etag = self.assertNotModified(url, self.client.get(url))
+        # Served from the response cache.
+        self.assertNotModified(url, self.client.get(url))
+
+        self.challenges[0].name = "Renamed"
+        self.challenges[0].save()
+        response = self.assertModified(url, etag)
+        self.assertEqual(response.data['challenges'][0]['name'], "Renamed")
+
+    def test_authenticated_grid(self):
+        url = reverse('get_bingo_grid')
+        self.client.force_authenticate(user=self.user1)
+        etag = self.assertNotModified(url, self.client.get(url))
+        # Only the user's progress is read to check the ETag.
+        with self.assertNumQueries(1):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.client.post(reverse('start_challenge'), {"position": 3})
+        response = self.assertModified(url, etag)
+        self.assertEqual(response.data['challenges'][3]['status'], 'started')
+
+        # Other users' grids have different ETags.
+        self.client.force_authenticate(user=self.user2)
+        self.assertModified(url, response['ETag'])
+
+    def test_leaderboard(self):
+        url = reverse('get_leaderboard')
+        self.client.force_authenticate(user=self.user1)
+        etag = self.assertNotModified(url, self.client.get(url))
+        with self.assertNumQueries(0):
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        leaderboard.add_points(self.user2, 10)
+        response = self.assertModified(url, etag)
+        self.assertEqual(response.data[0]['username'], "user2")
+
+    def test_profile(self):
+        url = reverse('get_profile_page', args=[self.user2.username])
+        self.client.force_authenticate(user=self.user1)
+        etag = self.assertNotModified(url, self.client.get(url))
+        self.assertFalse(self.client.get(url).data['permission'])
+
+        Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.ACCEPTED)
+        etag = self.assertModified(url, etag)['ETag']
+
+        TileInteraction.objects.create(user=self.user2, grid=self.grid, position=0, completed=True)
+        response = self.assertModified(url, etag)
+        self.assertEqual(len(response.data['challenges']), 1)
+
+        self.user2.bio = "New bio"
+        self.user2.save()
+        self.assertModified(url, response['ETag'])
+
+    def test_weak_and_multiple_etags(self):
+        url = reverse('get_leaderboard')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -0,0 +1,190 @@
+import csv
+import gzip
+import os
+import shutil
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from ..models import User, Challenge, Friendship, BingoGrid, TileInteraction, ExportJob
+from ..exports import start_export
+from ..tasks import run_export_job
+
+TEST_DIR = 'test_data'
+
+
+class ExportCsvTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="password123")
+        self.client.force_login(self.admin)
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.challenge = Challenge.objects.create(name="Challenge", challenge_type="act", points=5)
+        self.users = [User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com", password="password123")
+                      for i in range(5)]
+        for user in self.users:
+            for position in range(3):
+                TileInteraction.objects.create(user=user, grid=self.grid, position=position, completed=position == 0)
+
+    def export(self, model, queryset):
+        url = reverse(f"admin:bingo_{model._meta.model_name}_changelist")
+        response = self.client.post(url, {
+            "action": "csv_export_selected",
+            "_selected_action": [str(pk) for pk in queryset.values_list("pk", flat=True)],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+
+    def test_export_tiles(self):
+        rows = self.export(TileInteraction, TileInteraction.objects.all())
+        self.assertEqual(rows[0], ["user", "grid", "position", "description", "image", "image_status", "completed",
+                                   "consent", "date_started", "date_completed"])
+        self.assertEqual(len(rows), 16)
+        self.assertEqual({row[0] for row in rows[1:]}, {user.username for user in self.users})
+        self.assertEqual({row[1] for row in rows[1:]}, {str(self.grid)})
+        self.assertEqual({row[5] for row in rows[1:]}, {"No image"})
+
+    def test_export_friendships(self):
+        Friendship.objects.create(requester=self.users[0], receiver=self.users[1], status=Friendship.ACCEPTED)
+        rows = self.export(Friendship, Friendship.objects.all())
+        self.assertEqual(rows, [["requester", "receiver", "status"], ["user0", "user1", "Accepted"]])
+
+    def test_export_users_excludes_inactive(self):
+        self.users[0].is_active = False
+        self.users[0].save()
+        rows = self.export(User, User.objects.all())
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ["user1", "user2", "user3", "user4"])
+        self.assertNotIn("password", rows[0])
+
+    def test_related_objects_loaded_in_bulk(self):
+        url = reverse("admin:bingo_tileinteraction_changelist")
+        data = {
+            "action": "csv_export_selected",
+            "_selected_action": [str(pk) for pk in TileInteraction.objects.values_list("pk", flat=True)],
+        }
+        response = self.client.post(url, data)
+        # The rows, their users and their grids, no matter how many rows there are.
+        with self.assertNumQueries(3):
+            b"".join(response.streaming_content)
+
+
+@override_settings(EXPORT_ROOT=(TEST_DIR + '/exports'))
+class ExportJobTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="password123")
+        self.client.force_login(self.admin)
+        self.users = [User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com", password="password123")
+                      for i in range(5)]
+
+    def download(self, job):
+        response = self.client.get(reverse("admin:bingo_exportjob_download", args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    @override_settings(EXPORT_BACKGROUND_THRESHOLD=3)
+    def test_large_admin_export_runs_in_background(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse("admin:bingo_user_changelist"), {
+                "action": "csv_export_selected",
+                "_selected_action": [str(user.pk) for user in self.users[1:]],
+            }, follow=True)
+        job = ExportJob.objects.get()
+        self.assertContains(response, reverse("admin:bingo_exportjob_change", args=[job.pk]))
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(job.status, ExportJob.PENDING)
+
+        run_export_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.DONE)
+        self.assertEqual((job.rows_written, job.total_rows), (4, 4))
+        rows = list(csv.reader(StringIO(self.download(job).decode())))
+        self.assertEqual(rows[0][0], "username")
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ["user1", "user2", "user3", "user4"])
+
+        # Running the job again does nothing.
+        run_export_job(job.pk)
+        self.assertEqual(ExportJob.objects.get().file, job.file)
+
+    @override_settings(EXPORT_BACKGROUND_THRESHOLD=1)
+    def test_export_everything_in_filtered_list(self):
+        User.objects.filter(pk__in=[user.pk for user in self.users[2:]]).update(visibility=User.Visibility.PUBLIC)
+        url = reverse("admin:bingo_user_changelist") + f"?visibility__exact={User.Visibility.PUBLIC}"
+        with self.captureOnCommitCallbacks():
+            self.client.post(url, {"action": "csv_export_selected", "select_across": "1",
+                                   "_selected_action": [str(self.users[2].pk)]})
+        # The filters are stored, rather than the pk of every object in the list.
+        job = ExportJob.objects.get()
+        self.assertEqual((job.filters, job.ids, job.total_rows),
+                         ({"visibility__exact": [str(User.Visibility.PUBLIC)]}, None, 3))
+
+        with patch("bingo.exports.EXPORT_CHUNK_SIZE", 2):
+            run_export_job(job.pk, now=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), (ExportJob.DONE, 3))
+        rows = list(csv.reader(StringIO(self.download(job).decode())))
+        self.assertEqual([row[0] for row in rows[1:]], ["user2", "user3", "user4"])
+
+    @override_settings(EXPORT_TIME_LIMIT=0)
+    def test_written_in_parts(self):
+        job = start_export(User.objects.filter(pk__in=[user.pk for user in self.users[1:]]), compress=True, queue=False)
+        path = job.file.storage.path(f"users-{job.pk}.csv.gz")
+        with patch("bingo.exports.EXPORT_CHUNK_SIZE", 2), patch("bingo.tasks.async_task") as async_task:
+            run_export_job(job.pk)
+            async_task.assert_called_once_with("bingo.tasks.run_export_job", job.pk, 1, group="exports")
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.rows_written, job.parts_written), (ExportJob.RUNNING, 2, 1))
+
+            # A part handed out again after it finished does nothing.
+            run_export_job(job.pk)
+            self.assertEqual(ExportJob.objects.get().rows_written, 2)
+
+            # A part stopped after writing rows it didn't record starts again from the last chunk it recorded.
+            with open(path + ".part", "ab") as file:
+                file.write(b"unrecorded rows")
+            run_export_job(job.pk, 1)
+            run_export_job(job.pk, 2)
+        self.assertEqual(async_task.call_count, 2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written, job.total_rows), (ExportJob.DONE, 4, 4))
+        self.assertFalse(os.path.exists(path + ".part"))
+        rows = list(csv.reader(StringIO(gzip.decompress(self.download(job)).decode())))
+        self.assertEqual([row[0] for row in rows], ["username", "user1", "user2", "user3", "user4"])
+
+    def test_command_gzip(self):
+        call_command("export_csv", "user", "--gzip", "--now", stdout=StringIO())
+        job = ExportJob.objects.get()
+        self.assertTrue(job.file.name.endswith(".csv.gz"))
+        rows = list(csv.reader(StringIO(gzip.decompress(self.download(job)).decode())))
+        self.assertEqual(len(rows), 6)
+
+    def test_failed_job(self):
+        job = ExportJob.objects.create(model="bingo.gridprogress")
+        with self.assertLogs(level="ERROR"):
+            run_export_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.FAILED)
+        self.assertFalse(job.file)
+        self.assertEqual(self.client.get(reverse("admin:bingo_exportjob_download", args=[job.pk])).status_code, 404)
+
+    def test_missing_file(self):
+        call_command("export_csv", "user", "--now", stdout=StringIO())
+        job = ExportJob.objects.get()
+        os.remove(job.file.path)
+        self.assertEqual(self.client.get(reverse("admin:bingo_exportjob_download", args=[job.pk])).status_code, 404)
+
+    def test_file_deleted_with_job(self):
+        call_command("export_csv", "user", "--now", stdout=StringIO())
+        job = ExportJob.objects.get()
+        path = job.file.path
+        with self.settings(FILE_CLEANUP_ASYNC=False), self.captureOnCommitCallbacks(execute=True):
+            job.delete()
+            # The file is kept until the deletion is committed.
+            self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(path))
+
+    def tearDown(self):
+        try:
+            shutil.rmtree(TEST_DIR)
+        except OSError:
+            pass
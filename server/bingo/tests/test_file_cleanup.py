@@ -0,0 +1,76 @@
+import os
+import shutil
+import time
+from PIL import Image
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from ..file_cleanup import DeletionBatch
+from ..models import User, BingoGrid, TileInteraction
+from ..response_cache import Invalidation
+from ..tasks import sweep_orphan_files
+
+TEST_DIR = 'test_data'
+
+
+def make_image(name):
+    img = Image.new("RGB", (10, 10), color="red")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'), TILE_UPLOAD_ROOT=(TEST_DIR + '/uploads'), FILE_CLEANUP_ASYNC=False)
+class FileCleanupTest(TestCase):
+    def setUp(self):
+        self.grid = BingoGrid.objects.create(is_active=False)
+        self.users = [User.objects.create_user(username=f"user{i}", email=f"user{i}@example.com", password="password123")
+                      for i in range(3)]
+        self.tiles = [TileInteraction.objects.create(user=user, grid=self.grid, position=0, image=make_image(f"{user}.png"))
+                      for user in self.users]
+        self.paths = [tile.image.path for tile in self.tiles]
+
+    def test_deletions_batched_until_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            User.objects.filter(pk__in=[user.pk for user in self.users]).delete()
+        callbacks = [callback for callback in callbacks if not isinstance(callback, Invalidation)]
+        # The files of every tile deleted by the cascade are deleted together, and only after the commit.
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsInstance(callbacks[0], DeletionBatch)
+        self.assertTrue(all(os.path.isfile(path) for path in self.paths))
+
+        callbacks[0]()
+        self.assertFalse(any(os.path.isfile(path) for path in self.paths))
+
+    def test_rolled_back_deletion_keeps_files(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.tiles[0].delete()
+            try:
+                with transaction.atomic():
+                    self.tiles[1].delete()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(len([callback for callback in callbacks if not isinstance(callback, Invalidation)]), 1)
+        self.assertFalse(os.path.isfile(self.paths[0]))
+        self.assertTrue(os.path.isfile(self.paths[1]))
+
+    def test_sweep_orphan_files(self):
+        TileInteraction.objects.filter(pk=self.tiles[0].pk).update(image="")
+        new_orphan = os.path.join(os.path.dirname(self.paths[0]), "new.png")
+        with open(new_orphan, "wb") as file:
+            file.write(b"upload in progress")
+        old = time.time() - 2 * 24 * 60 * 60
+        for path in self.paths:
+            os.utime(path, (old, old))
+
+        sweep_orphan_files()
+        self.assertEqual([os.path.isfile(path) for path in self.paths], [False, True, True])
+        self.assertTrue(os.path.isfile(new_orphan))
+
+    def tearDown(self):
+        try:
+            shutil.rmtree(TEST_DIR)
+        except OSError:
+            pass
@@ -0,0 +1,81 @@
+import shutil
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..models import User, Friendship
+from ..friend_cache import are_friends, get_friend_ids
+
+
+TEST_DIR = 'test_data'
+
+
+@override_settings(FRIEND_CACHE_ALIAS="shared", CACHES={**settings.CACHES, "shared": {
+    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": TEST_DIR + "/cache"}})
+class FriendCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user1 = User.objects.create_user(username="user1", email="user1@example.com", password="password123")
+        self.user2 = User.objects.create_user(username="user2", email="user2@example.com", password="password123",
+                                              visibility=1)
+        self.user3 = User.objects.create_user(username="user3", email="user3@example.com", password="password123")
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    def test_friend_ids(self):
+        Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.ACCEPTED)
+        Friendship.objects.create(requester=self.user3, receiver=self.user1, status=Friendship.ACCEPTED)
+        Friendship.objects.create(requester=self.user2, receiver=self.user3, status=Friendship.PENDING)
+        self.assertEqual(get_friend_ids(self.user1.pk), {self.user2.pk, self.user3.pk})
+        self.assertEqual(get_friend_ids(self.user3.pk), {self.user1.pk})
+
+    def test_cache_hit_skips_database(self):
+        Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.ACCEPTED)
+        get_friend_ids(self.user1.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(are_friends(self.user1, self.user2))
+            self.assertFalse(are_friends(self.user1, self.user3))
+
+    def test_accept_and_delete_update_access(self):
+        friendship = Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.PENDING)
+        self.client.force_authenticate(user=self.user1)
+        profile_url = reverse('get_profile_page', args=[self.user2.username])
+        self.assertFalse(self.client.get(profile_url).data['permission'])
+
+        self.client.force_authenticate(user=self.user2)
+        self.client.post(reverse('accept_friendship', args=[friendship.id]))
+        self.assertIn(self.user1.pk, get_friend_ids(self.user2.pk))
+        self.client.force_authenticate(user=self.user1)
+        self.assertTrue(self.client.get(profile_url).data['permission'])
+
+        self.client.delete(reverse('delete_friendship', args=[friendship.id]))
+        self.assertEqual(get_friend_ids(self.user1.pk), set())
+        self.assertFalse(self.client.get(profile_url).data['permission'])
+
+    def test_moved_friendship(self):
+        friendship = Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.ACCEPTED)
+        self.assertTrue(are_friends(self.user1, self.user2))
+        # Like an admin edit, change the users of a friendship that was loaded from the database.
+        friendship = Friendship.objects.get(pk=friendship.pk)
+        friendship.receiver = self.user3
+        friendship.save()
+        self.assertFalse(are_friends(self.user1, self.user2))
+        self.assertFalse(are_friends(self.user2, self.user1))
+        self.assertTrue(are_friends(self.user3, self.user1))
+
+    def test_removed_friend_in_another_process(self):
+        friendship = Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.ACCEPTED)
+        self.assertTrue(are_friends(self.user1, self.user2))
+        friendship.delete()
+        # Another process has its own instance of the cache, which reads the same files.
+        del caches["shared"]
+        self.assertFalse(are_friends(self.user1, self.user2))
+
+    @override_settings(FRIEND_CACHE_ALIAS="default")
+    def test_process_local_cache_not_used(self):
+        Friendship.objects.create(requester=self.user1, receiver=self.user2, status=Friendship.ACCEPTED)
+        get_friend_ids(self.user1.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(are_friends(self.user1, self.user2))
@@ -70,6 +70,28 @@ class FriendViewsTest(TestCase):
         self.assertEqual(response.data['incoming_requests'][0]['userName'], 'user4')
         self.assertEqual(response.data['outgoing_requests'][0]['userName'], 'user3')
 
+    def test_get_all_friends_data_query_count(self):
+        """Test that all friends data is fetched in one query, however many friends there are"""
+        for i in range(10):
+            friend = User.objects.create_user(
+                username=f"friend{i}",
+                password="testpass123",
+                email=f"friend{i}@example.com"
+            )
+            Friendship.objects.create(
+                requester=friend if i % 2 else self.user1,
+                receiver=self.user1 if i % 2 else friend,
+                status='accepted' if i % 3 else 'pending'
+            )
+        self.client.force_authenticate(user=self.user1)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('all_friends_data'))
+        self.assertEqual(len(response.data['current_friends']), 7)
+        self.assertEqual(len(response.data['incoming_requests']), 3)
+        self.assertEqual(len(response.data['outgoing_requests']), 3)
+        self.assertIn(self.incoming_request.id,
+                      [request['friendship_id'] for request in response.data['incoming_requests']])
+
     def test_get_all_friends_data_unauthenticated(self):
         """Test getting all friends data when not authenticated"""
         response = self.client.get(reverse('all_friends_data'))
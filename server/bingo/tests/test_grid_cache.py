@@ -0,0 +1,84 @@
+import time
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from ..models import BingoGrid, Challenge, User
+from .. import grid_cache
+
+
+class GridCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.challenges = []
+        for i in range(20):
+            self.challenges.append(Challenge.objects.create(
+                name=f"Challenge {i}", description=f"Description {i}", challenge_type="act", points=5))
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.grid.challenges.add(*self.challenges[:16])
+
+    def get_grid(self):
+        return self.client.get(reverse('get_bingo_grid')).data
+
+    def test_cached_grid_needs_no_queries(self):
+        self.get_grid()
+        with self.assertNumQueries(0):
+            grid = self.get_grid()
+        self.assertEqual(grid['grid_id'], self.grid.grid_id)
+        self.assertEqual(grid['challenges'][0]['name'], "Challenge 0")
+
+    def test_cached_grid_not_modified_by_requests(self):
+        user = User.objects.create_user(username="user", email="user@example.com", password="password")
+        self.client.force_authenticate(user=user)
+        self.get_grid()
+        self.assertNotIn('status', grid_cache.get_active_grid().data['challenges'][0])
+
+    def test_invalidated_by_challenge_edit(self):
+        self.get_grid()
+        self.challenges[0].name = "Renamed challenge"
+        self.challenges[0].save()
+        self.assertEqual(self.get_grid()['challenges'][0]['name'], "Renamed challenge")
+
+    def test_not_invalidated_by_completion_count(self):
+        self.get_grid()
+        self.challenges[0].total_completions = 10
+        self.challenges[0].save(update_fields=['total_completions'])
+        with self.assertNumQueries(0):
+            self.get_grid()
+
+    def test_invalidated_by_grid_update(self):
+        self.get_grid()
+        admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="password")
+        self.client.force_authenticate(user=admin)
+        self.client.post(reverse('update-bingo-grid'), {"challenges": [c.id for c in self.challenges[4:]]})
+        self.client.force_authenticate(user=None)
+
+        grid = self.get_grid()
+        self.assertNotEqual(grid['grid_id'], self.grid.grid_id)
+        self.assertEqual(grid['challenges'][0]['name'], "Challenge 4")
+
+    def test_invalidated_by_deactivation(self):
+        self.get_grid()
+        self.grid.is_active = False
+        self.grid.save()
+        self.assertEqual(self.client.get(reverse('get_bingo_grid')).status_code, 404)
+
+    @override_settings(GRID_CACHE_ALIAS="default")
+    def test_shared_grid_expires(self):
+        grid_cache.invalidate()
+        load = grid_cache._load
+
+        def load_before_invalidation():
+            snapshot = load()
+            # Another process invalidates the grid after it has been loaded, but before it is stored.
+            cache.delete(grid_cache.SHARED_CACHE_KEY)
+            return snapshot
+
+        with mock.patch("bingo.grid_cache._load", load_before_invalidation):
+            grid_cache.get_active_grid()
+        self.assertIsNotNone(cache.get(grid_cache.SHARED_CACHE_KEY))
+        with mock.patch("time.time", return_value=time.time() + settings.GRID_CACHE_TIMEOUT + 1):
+            self.assertIsNone(cache.get(grid_cache.SHARED_CACHE_KEY))
+        grid_cache.invalidate()
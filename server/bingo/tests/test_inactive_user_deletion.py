@@ -1,4 +1,7 @@
-from django.test import TestCase
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest.mock import patch
 from bingo.models import User
 from freezegun import freeze_time
 from django.utils import timezone
@@ -37,3 +40,39 @@ class InactiveUserDeletionTestCase(TestCase):
 
         self.assertEqual(remaining_users, expected_users,
                          "Unexpected users were deleted.")
+
+    @override_settings(INACTIVE_PURGE_BATCH_SIZE=2)
+    def test_deleted_in_batches(self):
+        with freeze_time(timezone.now() - timedelta(days=2)):
+            for i in range(4):
+                User.objects.create(username=f"old{i}", password="verysecure123",
+                                    email=f"old{i}@example.com", is_active=False)
+        with self.assertLogs(level="INFO") as logs:
+            with CaptureQueriesContext(connection) as queries:
+                delete_inactive()
+        deletes = [query for query in queries if query['sql'].startswith('DELETE FROM "bingo_user"')]
+        self.assertEqual(len(deletes), 3)
+        self.assertIn("5 inactive users deleted.", logs.output[-1])
+        self.assertEqual(set(User.objects.values_list("username", flat=True)),
+                         {"user2", "user3", "user4", "user5", "user6"})
+
+    @override_settings(INACTIVE_PURGE_BATCH_SIZE=1, INACTIVE_PURGE_TIME_LIMIT=0)
+    def test_time_limit_queues_rest(self):
+        with freeze_time(timezone.now() - timedelta(days=2)):
+            User.objects.create(username="old", password="verysecure123", email="old@example.com", is_active=False)
+        with patch("bingo.tasks.async_task") as async_task:
+            delete_inactive()
+        async_task.assert_called_once_with("bingo.tasks.delete_inactive")
+        self.assertEqual(User.objects.filter(is_active=False, username__in=["user1", "old"]).count(), 1)
+
+    def test_activated_during_deletion(self):
+        atomic = transaction.atomic
+
+        def activate_first(*args, **kwargs):
+            # The user activates their account after the batch is listed, but before it is deleted.
+            User.objects.filter(pk=self.old_inactive_user.pk).update(is_active=True)
+            return atomic(*args, **kwargs)
+
+        with patch("bingo.tasks.transaction.atomic", side_effect=activate_first):
+            delete_inactive()
+        self.assertTrue(User.objects.filter(pk=self.old_inactive_user.pk, is_active=True).exists())
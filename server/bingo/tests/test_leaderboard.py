@@ -0,0 +1,57 @@
+from django.test import TestCase
+from ..models import User, LeaderboardScore
+from .. import leaderboard
+
+
+class LeaderboardScoreTest(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(
+            username="user1", email="user1@example.com", password="password", total_points=10)
+        self.user2 = User.objects.create_user(
+            username="user2", email="user2@example.com", password="password", total_points=10)
+        self.user3 = User.objects.create_user(
+            username="user3", email="user3@example.com", password="password", total_points=30)
+
+    def get_scores(self):
+        return dict(LeaderboardScore.objects.filter(user_count__gt=0).values_list("points", "user_count"))
+
+    def test_scores_counted_on_creation(self):
+        self.assertEqual(self.get_scores(), {10: 2, 30: 1})
+
+    def test_points_change(self):
+        self.user1.total_points = 40
+        self.user1.save()
+        self.assertEqual(self.get_scores(), {10: 1, 30: 1, 40: 1})
+
+        # A freshly loaded copy of the user should move from its loaded score.
+        user = User.objects.get(pk=self.user1.pk)
+        user.total_points = 30
+        user.save()
+        self.assertEqual(self.get_scores(), {10: 1, 30: 2})
+
+    def test_unranked_users(self):
+        User.objects.create_user(
+            username="inactive", email="inactive@example.com", password="password", total_points=50, is_active=False)
+        User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="password", total_points=60)
+        self.assertEqual(self.get_scores(), {10: 2, 30: 1})
+
+        self.user3.is_active = False
+        self.user3.save()
+        self.assertEqual(self.get_scores(), {10: 2})
+
+    def test_deletion(self):
+        self.user2.delete()
+        self.assertEqual(self.get_scores(), {10: 1, 30: 1})
+
+    def test_ranks(self):
+        top_users = leaderboard.get_top_users(20)
+        self.assertEqual([(user.username, user.rank) for user in top_users],
+                         [("user3", 1), ("user1", 2), ("user2", 2)])
+        self.assertEqual(leaderboard.get_rank(10), 2)
+        self.assertEqual(leaderboard.get_rank(0), 3)
+
+    def test_rebuild(self):
+        User.objects.filter(pk=self.user1.pk).update(total_points=99)
+        leaderboard.rebuild()
+        self.assertEqual(self.get_scores(), {10: 1, 30: 1, 99: 1})
@@ -0,0 +1,65 @@
+from collections import Counter
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from io import StringIO
+from .. import load_data
+from ..engine import bingo_points
+from ..models import BingoGrid, Challenge, Friendship, GridProgress, LeaderboardScore, TileInteraction, User
+
+
+class LoadDataTest(TestCase):
+    def setUp(self):
+        self.counts = load_data.seed(users=300, friends=6, tiles=6, random_seed=1, batch_size=100)
+
+    def test_seeded_data(self):
+        self.assertEqual(self.counts, load_data.count())
+        self.assertEqual(self.counts["users"], 300)
+        self.assertTrue(load_data.is_seeded())
+        user = User.objects.get(username=load_data.username(0))
+        self.assertTrue(user.check_password(load_data.PASSWORD))
+
+        # Points, progress and the leaderboard agree with the tiles.
+        challenges = list(BingoGrid.objects.get(is_active=True).challenges.all())
+        progress = {row.user_id: row for row in GridProgress.objects.all()}
+        completed = Counter()
+        for tile in TileInteraction.objects.all():
+            self.assertTrue(progress[tile.user_id].started_mask & (1 << tile.position))
+            if tile.completed:
+                self.assertGreaterEqual(tile.date_completed, tile.date_started)
+                completed[tile.user_id] += challenges[tile.position].points
+        for user in User.objects.all():
+            mask = progress[user.pk].completed_mask if user.pk in progress else 0
+            self.assertEqual(user.total_points, completed[user.pk] + bingo_points(mask))
+        self.assertEqual(sum(LeaderboardScore.objects.values_list('user_count', flat=True)), 300)
+
+        # New users get ids after the seeded ones.
+        self.assertGreater(User.objects.create_user(username="new", email="new@example.com", password="pw").pk,
+                           user.pk)
+
+    def test_friendships(self):
+        self.assertFalse(Friendship.objects.filter(requester=F('receiver')).exists())
+        pairs = [frozenset(pair) for pair in Friendship.objects.values_list('requester_id', 'receiver_id')]
+        self.assertEqual(len(pairs), len(set(pairs)))
+        # Friend counts follow a power law, so the most popular users have many times the mean.
+        degrees = Counter(user_id for pair in pairs for user_id in pair)
+        mean = 2 * len(pairs) / self.counts["users"]
+        self.assertLess(abs(mean - 6), 3)
+        self.assertGreater(max(degrees.values()), 4 * mean)
+
+    def test_seed_is_deterministic(self):
+        users = list(User.objects.order_by('username').values_list('username', 'total_points', 'avatar'))
+        friendships = Friendship.objects.count()
+        User.objects.all().delete()
+        BingoGrid.objects.all().delete()
+        Challenge.objects.all().delete()
+        load_data.seed(users=300, friends=6, tiles=6, random_seed=1, batch_size=100)
+        self.assertEqual(list(User.objects.order_by('username').values_list('username', 'total_points', 'avatar')),
+                         users)
+        self.assertEqual(Friendship.objects.count(), friendships)
+
+    def test_command_refuses_to_seed_twice(self):
+        out = StringIO()
+        call_command('seed_load_data', users=10, stdout=out)
+        self.assertIn("already", out.getvalue())
+        self.assertEqual(User.objects.count(), 300)
@@ -0,0 +1,114 @@
+import marshal
+import os
+import shutil
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from ..models import BingoGrid, Challenge, ProfileCapture, User
+
+TEST_DIR = 'test_data'
+
+
+@override_settings(PROFILE_ROOT=TEST_DIR + '/profiles')
+class ProfilingTest(TestCase):
+    def setUp(self):
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.grid.challenges.add(*[Challenge.objects.create(name=f"Challenge {i}", description="Description",
+                                                            challenge_type="act", points=5) for i in range(16)])
+        self.superuser = User.objects.create_superuser(username="admin", email="admin@example.com",
+                                                       password="password123")
+        self.user = User.objects.create_user(username="user1", email="user1@example.com", password="password123")
+        self.client = APIClient()
+        self.url = reverse('get_bingo_grid')
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+    def test_profile_header(self):
+        self.authenticate(self.superuser)
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['challenges']), 16)
+
+        capture = ProfileCapture.objects.get(pk=response['X-Profile-Capture'])
+        self.assertEqual(capture.created_by, self.superuser)
+        self.assertEqual((capture.method, capture.path, capture.route, capture.status_code),
+                         ('GET', self.url, 'get_bingo_grid', 200))
+        self.assertGreater(capture.duration_ms, 0)
+        with capture.file.open('rb') as file:
+            stats = marshal.load(file)
+        self.assertTrue(any(function == 'get_bingo_grid' for _, _, function in stats))
+
+    def test_profile_parameter(self):
+        self.authenticate(self.superuser)
+        response = self.client.get(self.url, {'profile': ''})
+        self.assertIn('X-Profile-Capture', response)
+        self.assertEqual(ProfileCapture.objects.get().path, self.url + '?profile=')
+
+    def test_admin_session(self):
+        self.client.force_login(self.superuser)
+        # The admin's lists treat query parameters as filters, so the header is used.
+        response = self.client.get(reverse('admin:bingo_user_changelist'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(ProfileCapture.objects.get().route, 'bingo_user_changelist')
+
+    def test_not_requested(self):
+        self.authenticate(self.superuser)
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Profile-Capture', response)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_not_superuser(self):
+        for user in (self.user, None):
+            if user:
+                self.authenticate(user)
+            else:
+                self.client.credentials()
+            response = self.client.get(self.url, HTTP_X_PROFILE='1')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('X-Profile-Capture', response)
+        # An invalid token is ignored, and rejected by the view as usual.
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+        response = self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    @override_settings(PROFILE_CAPTURES_KEPT=2, FILE_CLEANUP_ASYNC=False)
+    def test_old_captures_deleted(self):
+        self.authenticate(self.superuser)
+        # Files are deleted once the deletion of their captures is committed.
+        with self.captureOnCommitCallbacks(execute=True):
+            captures = [ProfileCapture.objects.get(pk=self.client.get(self.url, HTTP_X_PROFILE='1')['X-Profile-Capture'])
+                        for _ in range(3)]
+            self.assertTrue(os.path.exists(captures[0].file.path))
+        self.assertEqual(set(ProfileCapture.objects.all()), set(captures[1:]))
+        self.assertFalse(os.path.exists(captures[0].file.path))
+        self.assertTrue(os.path.exists(captures[2].file.path))
+
+    def test_admin(self):
+        self.authenticate(self.superuser)
+        capture = ProfileCapture.objects.get(pk=self.client.get(self.url, HTTP_X_PROFILE='1')['X-Profile-Capture'])
+        self.client.credentials()
+        self.client.force_login(self.superuser)
+
+        response = self.client.get(reverse('admin:bingo_profilecapture_changelist'))
+        self.assertContains(response, str(capture))
+        response = self.client.get(reverse('admin:bingo_profilecapture_change', args=[capture.pk]))
+        self.assertContains(response, 'get_bingo_grid')
+        response = self.client.get(reverse('admin:bingo_profilecapture_download', args=[capture.pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with capture.file.open('rb') as file:
+            self.assertEqual(b''.join(response.streaming_content), file.read())
+
+        os.remove(capture.file.path)
+        response = self.client.get(reverse('admin:bingo_profilecapture_download', args=[capture.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:bingo_profilecapture_download', args=[capture.pk]))
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
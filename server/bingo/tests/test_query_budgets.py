@@ -0,0 +1,153 @@
+import shutil
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from .. import leaderboard, urls
+from ..benchmarks import clear_caches, make_image
+from ..models import BingoGrid, Challenge, Friendship, TileInteraction, User
+from ..tokens import email_verification_token_generator
+
+TEST_DIR = 'test_data'
+PASSWORD = 'Password123'
+# Every route is requested with data of each size, and must make the same number of queries with all of them.
+SIZES = (2, 6, 12)
+
+
+class QueryBudgetData:
+    """
+    Data in which the member making requests has `size` friends, friend requests each way, grids their
+    friend has played, and so on, so that a query made for each of them shows up as the size grows.
+    """
+
+    def __init__(self, size, password):
+        self.challenges = Challenge.objects.bulk_create(
+            Challenge(name=f"Challenge {i}", description="Description", challenge_type="act", points=10)
+            for i in range(16))
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.grid.challenges.add(*self.challenges)
+        old_grids = []
+        for _ in range(size):
+            old_grids.append(BingoGrid.objects.create())
+            old_grids[-1].challenges.add(*self.challenges)
+
+        # Users are created in bulk, with a password that is only hashed once.
+        users = User.objects.bulk_create(
+            User(username=f"user{i:03d}", email=f"user{i:03d}@example.com", password=password, total_points=10 * i,
+                 visibility=User.Visibility.PUBLIC)
+            for i in range(3 * size + 2))
+        self.member, self.stranger = users[0], users[-1]
+        friends = users[1:size + 1]
+        self.friend = friends[0]
+        self.friendships = Friendship.objects.bulk_create(
+            [Friendship(requester=self.member, receiver=user, status=Friendship.ACCEPTED) for user in friends]
+            + [Friendship(requester=self.member, receiver=user, status=Friendship.PENDING)
+               for user in users[size + 1:2 * size + 1]]
+            + [Friendship(requester=user, receiver=self.member, status=Friendship.PENDING)
+               for user in users[2 * size + 1:3 * size + 1]])
+        self.incoming_request = self.friendships[-1]
+        self.unverified = User.objects.create(username="unverified", email="unverified@example.com",
+                                              password=password, is_active=False)
+        self.admin = User.objects.create(username="admin", email="admin@example.com", password=password,
+                                         is_superuser=True)
+
+        # The member has completed all but the first of their tiles, and their friend has played every grid.
+        for position in range(size):
+            TileInteraction.objects.create(user=self.member, grid=self.grid, position=position, completed=position > 0)
+            TileInteraction.objects.create(user=self.friend, grid=self.grid, position=position, completed=True)
+        for position, grid in enumerate(old_grids):
+            TileInteraction.objects.create(user=self.friend, grid=grid, position=position, completed=True)
+        leaderboard.rebuild()
+
+
+def uid(user):
+    return urlsafe_base64_encode(force_bytes(user.pk))
+
+
+# How each route is requested: its method, who by, and a function returning the URL's arguments and the request's
+# keyword arguments. Every route in bingo/urls.py must be here, and have a budget in QUERY_BUDGETS.
+ROUTE_REQUESTS = {
+    'token_obtain_pair': ('post', None, lambda data: ([], {'data': {'username': data.member.username,
+                                                                    'password': PASSWORD}})),
+    'token_refresh': ('post', None, lambda data: ([], {'data': {'refresh': str(RefreshToken.for_user(data.member))}})),
+    'register_user': ('post', None, lambda data: ([], {'data': {
+        'username': 'newuser', 'first_name': 'New', 'last_name': 'User', 'email': 'newuser@example.com',
+        'password': 'N3wPassword!'}})),
+    'update_preferences': ('put', 'member', lambda data: ([], {'data': {'avatar': 3}})),
+    'get_leaderboard': ('get', 'member', lambda data: ([], {})),
+    'current_user': ('get', 'member', lambda data: ([], {})),
+    'delete_friendship': ('delete', 'member', lambda data: ([data.friendships[0].pk], {})),
+    'start_challenge': ('post', 'member', lambda data: ([], {'data': {'position': 15}})),
+    'all_friends_data': ('get', 'member', lambda data: ([], {})),
+    'get_bingo_grid': ('get', 'member', lambda data: ([], {})),
+    'accept_friendship': ('post', 'member', lambda data: ([data.incoming_request.pk], {})),
+    'get_profile_page': ('get', 'member', lambda data: ([data.friend.username], {})),
+    'complete_challenge': ('patch', 'member', lambda data: ([], {
+        'data': {'position': 0, 'consent': True, 'image': make_image()}, 'format': 'multipart'})),
+    'request_friendship': ('post', 'member', lambda data: ([data.stranger.pk], {})),
+    'user_search': ('post', 'member', lambda data: ([], {'data': {'query_string': 'user'}})),
+    'update-bingo-grid': ('post', 'admin', lambda data: ([], {
+        'data': {'challenges': [challenge.pk for challenge in reversed(data.challenges)]}})),
+    'request_verification': ('post', None, lambda data: ([], {'data': {'email': data.unverified.email}})),
+    'confirm_email': ('post', None, lambda data: ([], {'data': {
+        'uid64': uid(data.unverified), 'token': email_verification_token_generator.make_token(data.unverified)}})),
+    'request_password_reset': ('post', None, lambda data: ([], {'data': {'email': data.member.email}})),
+    'reset_password': ('post', None, lambda data: ([], {'data': {
+        'uid64': uid(data.member), 'token': default_token_generator.make_token(data.member),
+        'password': 'N3wPassword!'}})),
+}
+
+
+@override_settings(MEDIA_ROOT=TEST_DIR + '/media', TILE_UPLOAD_ROOT=TEST_DIR + '/uploads')
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.password = make_password(PASSWORD)
+
+    def tearDown(self):
+        shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+    def count_queries(self, data, route):
+        """
+        Makes the route's request with cold caches, and returns how many queries it made. Its changes are rolled back.
+        """
+        method, user, arguments = ROUTE_REQUESTS[route]
+        args, kwargs = arguments(data)
+        client = APIClient()
+        if user:
+            # Tokens are used rather than forcing authentication, so loading the user is counted.
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(getattr(data, user))}")
+        clear_caches()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, method)(reverse(route, args=args), **kwargs)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, f"{route}: {response.data}")
+        return len(queries)
+
+    def test_every_route_is_covered(self):
+        routes = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(routes, set(ROUTE_REQUESTS))
+        self.assertEqual(routes - set(settings.QUERY_BUDGETS), set())
+
+    def test_query_counts(self):
+        counts = {route: [] for route in ROUTE_REQUESTS}
+        for size in SIZES:
+            with transaction.atomic():
+                data = QueryBudgetData(size, self.password)
+                for route in ROUTE_REQUESTS:
+                    counts[route].append(self.count_queries(data, route))
+                transaction.set_rollback(True)
+
+        for route, route_counts in counts.items():
+            with self.subTest(route=route):
+                self.assertEqual(len(set(route_counts)), 1,
+                                 f"{route} makes more queries with more data: {dict(zip(SIZES, route_counts))}")
+                self.assertLessEqual(route_counts[0], settings.QUERY_BUDGETS[route])
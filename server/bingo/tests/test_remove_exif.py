@@ -13,7 +13,7 @@ import shutil
 TEST_DIR = 'test_data'
 
 
-@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'))
+@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'), TILE_UPLOAD_ROOT=(TEST_DIR + '/uploads'), TILE_IMAGE_ASYNC=False)
 class ImageExifRemovalTest(TestCase):
     def setUp(self):
         self.user = User.objects.create(username="testuser")
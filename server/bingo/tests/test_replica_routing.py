@@ -0,0 +1,120 @@
+import shutil
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import router
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .. import leaderboard
+from ..models import BingoGrid, Challenge, GridProgress, User
+from ..middleware import ReplicaStickinessMiddleware
+from ..routers import ReplicaRouter
+
+TEST_DIR = 'test_data'
+
+
+# Users who change something are marked in a cache shared between processes.
+@override_settings(REPLICA_DATABASE="replica", REPLICA_STICKY_CACHE_ALIAS="sticky", CACHES={**settings.CACHES, "sticky": {
+    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": TEST_DIR + "/cache"}})
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.addCleanup(shutil.rmtree, TEST_DIR, ignore_errors=True)
+        cache.clear()
+        self.client = APIClient()
+        grid = BingoGrid.objects.create(is_active=True)
+        grid.challenges.add(*[Challenge.objects.create(name=f"Challenge {i}", description="Description",
+                                                       challenge_type="act", points=5) for i in range(16)])
+        self.user1 = User.objects.create_user(username="user1", email="user1@example.com", password="password123")
+        self.user2 = User.objects.create_user(username="user2", email="user2@example.com", password="password123")
+        # Forget the changes made by creating the users, which send reads to the primary database for a while.
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def read_database(self):
+        # The database the grid view reads the user's progress from, without querying the replica.
+        databases = []
+
+        def get_progress(user_id, grid_id):
+            databases.append(router.db_for_read(GridProgress))
+            return GridProgress(user_id=user_id, grid_id=grid_id)
+
+        with mock.patch("bingo.views.bingo_views.get_progress", get_progress):
+            response = self.client.get(reverse("get_bingo_grid"))
+        self.assertEqual(response.status_code, 200)
+        return databases[0]
+
+    def test_read_only_view_reads_replica(self):
+        self.client.force_authenticate(user=self.user1)
+        self.assertEqual(self.read_database(), "replica")
+
+    def test_anonymous_read_uses_replica(self):
+        with mock.patch("bingo.views.leaderboard_views.leaderboard.get_top_users",
+                        side_effect=lambda size: self.assertEqual(router.db_for_read(User), "replica") or []):
+            self.assertEqual(self.client.get(reverse("get_leaderboard")).status_code, 200)
+
+    def test_reads_after_version_change_use_primary(self):
+        databases = []
+
+        def get_top_users(size):
+            databases.append(router.db_for_read(User))
+            return []
+
+        with mock.patch("bingo.views.leaderboard_views.leaderboard.get_top_users", get_top_users):
+            self.client.get(reverse("get_leaderboard"))
+            # The replica might not have the new points yet, so they aren't read from it under the new version.
+            leaderboard.add_points(self.user2, 10)
+            self.client.get(reverse("get_leaderboard"))
+            with mock.patch("bingo.response_cache.settings.REPLICA_STICKY_SECONDS", 0):
+                leaderboard.add_points(self.user2, 10)
+            self.client.get(reverse("get_leaderboard"))
+        self.assertEqual(databases, ["replica", "default", "replica"])
+
+    def test_other_views_use_primary(self):
+        self.assertEqual(router.db_for_read(User), "default")
+        self.client.force_authenticate(user=self.user1)
+        self.assertEqual(self.client.get(reverse("current_user")).status_code, 200)
+        self.assertEqual(router.db_for_read(User), "default")
+
+    def test_reads_after_write_use_primary(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.post(reverse("start_challenge"), {"position": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read_database(), "default")
+
+        # Other users still read from the replica.
+        self.client.force_authenticate(user=self.user2)
+        self.assertEqual(self.read_database(), "replica")
+
+    def test_failed_write_and_search_are_not_sticky(self):
+        self.client.force_authenticate(user=self.user1)
+        self.assertEqual(self.client.post(reverse("start_challenge"), {"position": 30}).status_code, 422)
+        with override_settings(USER_SEARCH_INDEX=True), \
+                mock.patch("bingo.views.user_views.username_index.search", return_value=[]), \
+                mock.patch("bingo.views.user_views.check_friendships", return_value=[]):
+            self.assertEqual(self.client.post(reverse("user_search"), {"query_string": "user"}).status_code, 200)
+        self.assertEqual(self.read_database(), "replica")
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_without_replica(self):
+        self.client.force_authenticate(user=self.user1)
+        self.assertEqual(self.read_database(), "default")
+
+    def test_shared_cache_required(self):
+        with override_settings(REPLICA_STICKY_CACHE_ALIAS="default"):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaStickinessMiddleware(lambda request: None)
+            with override_settings(REPLICA_DATABASE=None):
+                ReplicaStickinessMiddleware(lambda request: None)
+
+    def test_sticky_across_processes(self):
+        self.client.force_authenticate(user=self.user1)
+        self.client.post(reverse("start_challenge"), {"position": 3})
+        # Another process has its own instance of the cache, which reads the same files.
+        del caches["sticky"]
+        self.assertEqual(self.read_database(), "default")
+
+    def test_replica_is_not_migrated(self):
+        self.assertFalse(ReplicaRouter().allow_migrate("replica", "bingo"))
+        self.assertIsNone(ReplicaRouter().allow_migrate("default", "bingo"))
@@ -0,0 +1,78 @@
+import json
+import re
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .. import middleware
+from ..models import BingoGrid, Challenge, Friendship, User
+
+
+@override_settings(REQUEST_TIMING=True)
+class RequestTimingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.grid.challenges.add(*[Challenge.objects.create(name=f"Challenge {i}", description="Description",
+                                                            challenge_type="act", points=5) for i in range(16)])
+        self.user = User.objects.create_user(username="user1", email="user1@example.com", password="password123")
+        for i in range(3):
+            friend = User.objects.create_user(username=f"friend{i}", email=f"friend{i}@example.com",
+                                              password="password123")
+            Friendship.objects.create(requester=self.user, receiver=friend, status=Friendship.ACCEPTED)
+        # Tokens are used rather than forcing authentication, so loading the user is counted.
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def get_log(self, logs):
+        self.assertEqual(len(logs.records), 1)
+        return json.loads(logs.records[0].getMessage())
+
+    def test_server_timing(self):
+        with self.assertLogs(middleware.logger, 'INFO') as logs:
+            response = self.client.post(reverse('user_search'), {'query_string': 'friend'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = dict(re.match(r'(\w+);dur=[\d.]+', metric).group(1, 0)
+                       for metric in response['Server-Timing'].split(', '))
+        self.assertEqual(list(metrics), ['db', 'view', 'render', 'total'])
+
+        log = self.get_log(logs)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(log['route'], 'user_search')
+        self.assertEqual(log['status'], 200)
+        self.assertFalse(log['over_budget'])
+        self.assertIn(f'desc="{log["queries"]} queries"', response['Server-Timing'])
+        self.assertLessEqual(log['db_ms'], log['total_ms'])
+        self.assertLessEqual(log['view_ms'] + log['render_ms'], log['total_ms'])
+
+    def test_query_count(self):
+        with self.assertLogs(middleware.logger, 'INFO') as logs, self.assertNumQueries(3):
+            self.client.post(reverse('user_search'), {'query_string': 'friend'})
+        self.assertEqual(self.get_log(logs)['queries'], 3)
+
+    @override_settings(QUERY_BUDGETS={'user_search': 2})
+    def test_over_budget(self):
+        with self.assertLogs(middleware.logger, 'INFO') as logs:
+            self.client.post(reverse('user_search'), {'query_string': 'friend'})
+        log = self.get_log(logs)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertTrue(log['over_budget'])
+        self.assertEqual(log['query_budget'], 2)
+
+    def test_no_route(self):
+        with self.assertLogs(middleware.logger, 'INFO') as logs:
+            response = self.client.get('/api/missing/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        log = self.get_log(logs)
+        self.assertIsNone(log['route'])
+        self.assertIsNone(log['query_budget'])
+        self.assertNotIn('view', log)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse('get_bingo_grid'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Server-Timing', response)
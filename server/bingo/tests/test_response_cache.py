@@ -0,0 +1,111 @@
+import shutil
+import time
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .. import leaderboard, response_cache
+from ..models import BingoGrid, Challenge, User
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        self.grid = BingoGrid.objects.create(is_active=True)
+        self.challenges = [Challenge.objects.create(name=f"Challenge {i}", description="Description",
+                                                    challenge_type="act", points=5) for i in range(16)]
+        self.grid.challenges.add(*self.challenges)
+        self.user1 = User.objects.create_user(username="user1", email="user1@example.com", password="password123",
+                                              total_points=20)
+        self.user2 = User.objects.create_user(username="user2", email="user2@example.com", password="password123",
+                                              total_points=10)
+
+    def get_leaderboard(self):
+        return [(user['username'], user['total_points']) for user in self.client.get(reverse('get_leaderboard')).data]
+
+    def test_anonymous_leaderboard_cached(self):
+        self.assertEqual(self.get_leaderboard(), [("user1", 20), ("user2", 10)])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_leaderboard(), [("user1", 20), ("user2", 10)])
+
+    def test_leaderboard_invalidated_by_writes(self):
+        self.get_leaderboard()
+        leaderboard.add_points(self.user2, 15)
+        self.assertEqual(self.get_leaderboard(), [("user2", 25), ("user1", 20)])
+
+        self.user1.username = "renamed"
+        self.user1.save()
+        self.assertEqual(self.get_leaderboard(), [("user2", 25), ("renamed", 20)])
+
+        self.user2.delete()
+        self.assertEqual(self.get_leaderboard(), [("renamed", 20)])
+
+    def test_leaderboard_not_invalidated_by_login(self):
+        self.get_leaderboard()
+        self.client.post(reverse('token_obtain_pair'), {"username": "user1", "password": "password123"})
+        with self.assertNumQueries(0):
+            self.get_leaderboard()
+
+    def test_authenticated_requests_not_cached(self):
+        self.client.force_authenticate(user=self.user2)
+        board = self.client.get(reverse('get_leaderboard')).data
+        self.assertEqual(board[-1]['username'], "user2")
+        self.client.force_authenticate(user=None)
+        self.assertEqual(len(self.client.get(reverse('get_leaderboard')).data), 2)
+
+    def test_anonymous_grid_invalidated_by_challenge_change(self):
+        self.assertEqual(self.client.get(reverse('get_bingo_grid')).data['challenges'][0]['name'], "Challenge 0")
+        self.challenges[0].name = "Renamed"
+        self.challenges[0].save()
+        self.assertEqual(self.client.get(reverse('get_bingo_grid')).data['challenges'][0]['name'], "Renamed")
+
+    def test_anonymous_grid_invalidated_by_new_grid(self):
+        self.client.get(reverse('get_bingo_grid'))
+        self.grid.is_active = False
+        self.grid.save()
+        new_grid = BingoGrid.objects.create(is_active=True)
+        new_grid.challenges.add(*reversed(self.challenges))
+        data = self.client.get(reverse('get_bingo_grid')).data
+        self.assertEqual(data['grid_id'], new_grid.grid_id)
+        self.assertEqual(data['challenges'][0]['name'], "Challenge 15")
+
+    def test_invalidations_batched_until_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks, transaction.atomic():
+            User.objects.all().delete()
+            self.challenges[0].delete()
+        invalidations = [callback for callback in callbacks if isinstance(callback, response_cache.Invalidation)]
+        self.assertEqual(len(invalidations), 1)
+        self.assertEqual(invalidations[0].names, {response_cache.GRID, response_cache.LEADERBOARD})
+
+    def test_versions_do_not_expire(self):
+        version = response_cache.get_version(response_cache.LEADERBOARD)
+        later = time.time() + 10 * settings.RESPONSE_CACHE_TIMEOUT
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(response_cache.get_version(response_cache.LEADERBOARD), version)
+
+    @override_settings(RESPONSE_CACHE_ALIAS="shared", CACHES={**settings.CACHES, "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "test_data/cache"}})
+    def test_bumped_versions_do_not_expire(self):
+        self.addCleanup(shutil.rmtree, "test_data", ignore_errors=True)
+        version = response_cache.get_version(response_cache.LEADERBOARD)
+        response_cache.invalidate(response_cache.LEADERBOARD)
+        later = time.time() + 10 * settings.RESPONSE_CACHE_TIMEOUT + 300
+        with mock.patch('time.time', return_value=later):
+            self.assertEqual(response_cache.get_version(response_cache.LEADERBOARD), version + 1)
+
+    @override_settings(RESPONSE_CACHE_ALIAS="shared", CACHES={**settings.CACHES, "shared": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "test_data/cache"}})
+    def test_etags_shared_between_processes(self):
+        self.addCleanup(shutil.rmtree, "test_data", ignore_errors=True)
+        etag = self.client.get(reverse('get_leaderboard'))['ETag']
+        # Another process has its own instance of the cache, which reads the same files.
+        del caches["shared"]
+        self.assertEqual(self.client.get(reverse('get_leaderboard'))['ETag'], etag)
+        leaderboard.add_points(self.user2, 15)
+        del caches["shared"]
+        self.assertNotEqual(self.client.get(reverse('get_leaderboard'))['ETag'], etag)
@@ -100,6 +100,7 @@ class ProfilePageViewTestCase(TestCase):
         self.assertEqual(challenge['type'], 'Act')
         self.assertEqual(challenge['points'], 5)
         self.assertEqual(challenge['image'], '/media/path/to/image0.png')
+        self.assertIsNone(challenge['thumbnails'])
         self.assertEqual(
             challenge['finishDate'], self.completion_date.strftime("%d/%m/%y %I:%M %p"))
 
@@ -178,3 +179,33 @@ class ProfilePageViewTestCase(TestCase):
             response.data, self.users['friend']
         )
         self._assert_challenge_data(response.data['challenges'])
+
+    def test_challenges_resolved_in_bulk(self):
+        # Tiles from several grids should not need a query per tile or per grid.
+        for _ in range(3):
+            grid = BingoGrid.objects.create()
+            grid.challenges.add(*self.challenges[::-1])
+            self._create_tile_interactions(self.users['public'], grid, 16)
+
+        url = reverse('get_profile_page', kwargs={'username': 'public'})
+        # The user, their tiles, and the challenges of every grid.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        titles = sorted(challenge['title'] for challenge in response.data['challenges'])
+        self.assertEqual(titles, sorted(4 * [challenge.name for challenge in self.challenges]))
+
+        # The challenges of each grid are then cached.
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_thumbnail_urls(self):
+        TileInteraction.objects.filter(user=self.users['public'], position=0).update(
+            image_status=TileInteraction.IMAGE_READY)
+        response = self.client.get(reverse('get_profile_page', kwargs={'username': 'public'}))
+        challenge = next(challenge for challenge in response.data['challenges'] if challenge['title'] == 'Challenge 0')
+        self.assertEqual(challenge['imageStatus'], TileInteraction.IMAGE_READY)
+        self.assertEqual(challenge['thumbnails'], {
+            'small': '/media/path/to/image0_small.webp',
+            'medium': '/media/path/to/image0_medium.webp',
+            'large': '/media/path/to/image0_large.webp',
+        })
@@ -1,9 +1,25 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
 from ..models import User, Challenge, TileInteraction, BingoGrid
 from django.utils import timezone
 from django.db.utils import IntegrityError
 from django.urls import reverse
 from rest_framework.test import APIClient
+from PIL import Image
+from io import BytesIO
+import os
+import shutil
+
+TEST_DIR = 'test_data'
+
+
+def make_image(name):
+    img = Image.new("RGB", (10, 10), color="red")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
 
 
 class TileInteractionTest(TestCase):
@@ -90,6 +106,58 @@ class TileInteractionTest(TestCase):
                 user=self.user, grid=self.grid, position=16)
 
 
+@override_settings(MEDIA_ROOT=(TEST_DIR + '/media'), FILE_CLEANUP_ASYNC=False)
+class TileImageChangeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            email="test@example.com",
+            password="password123",
+        )
+        self.grid = BingoGrid.objects.create(is_active=False)
+        self.tile = TileInteraction.objects.create(
+            user=self.user, grid=self.grid, position=0, image=make_image("first.png"))
+
+    def test_save_does_not_reload_tile(self):
+        tile = TileInteraction.objects.get(pk=self.tile.pk)
+        tile.description = "Updated"
+        with CaptureQueriesContext(connection) as queries:
+            tile.save()
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT "bingo_tileinteraction"')])
+
+    def test_replaced_image_deleted_on_commit(self):
+        tile = TileInteraction.objects.get(pk=self.tile.pk)
+        old_path = tile.image.path
+        # The new image is given the same name, and has to be renamed when it is saved.
+        tile.image = make_image("first.png")
+        with self.captureOnCommitCallbacks() as callbacks:
+            tile.save()
+        self.assertNotEqual(tile.image.path, old_path)
+        self.assertTrue(os.path.isfile(old_path))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(os.path.isfile(old_path))
+        self.assertTrue(os.path.isfile(tile.image.path))
+
+        # Saving again keeps the new image.
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            tile.save()
+        self.assertEqual(callbacks, [])
+
+    def test_unchanged_image_kept(self):
+        tile = TileInteraction.objects.get(pk=self.tile.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            tile.save()
+        self.assertTrue(os.path.isfile(tile.image.path))
+
+    def tearDown(self):
+        try:
+            shutil.rmtree(TEST_DIR)
+        except OSError:
+            pass
+
+
 class StartChallengeTest(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.test import TestCase
+from ..transactions import on_commit_batch
+
+
+class Batch:
+    def __init__(self):
+        self.items = []
+
+    def __call__(self):
+        pass
+
+
+class OnCommitBatchTest(TestCase):
+    def test_one_batch_per_savepoint(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            batch = on_commit_batch(Batch)
+            self.assertIs(on_commit_batch(Batch), batch)
+            with transaction.atomic():
+                self.assertIsNot(on_commit_batch(Batch), batch)
+            try:
+                with transaction.atomic():
+                    on_commit_batch(Batch).items.append("rolled back")
+                    raise ValueError
+            except ValueError:
+                pass
+            self.assertIs(on_commit_batch(Batch), batch)
+        self.assertEqual(len(callbacks), 2)
+        self.assertNotIn(["rolled back"], [callback.items for callback in callbacks])
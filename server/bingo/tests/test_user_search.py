@@ -1,8 +1,9 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.urls import reverse
 from ..models import User, Friendship
+from ..search import username_index
 
 
 class UserSearchTest(TestCase):
@@ -92,6 +93,33 @@ class UserSearchTest(TestCase):
         self.assertIn(self.target_result, response.data)
         self.assertEqual(len(response.data), 15)
 
+    def test_friendships_fetched_in_one_query(self):
+        for i in range(15):
+            user = User.objects.create_user(username=f'lebronclone{i}',
+                                            password='Password123', email=f'clone{i}@mail.com')
+            Friendship.objects.create(requester=user if i % 2 else self.current_user,
+                                      receiver=self.current_user if i % 2 else user)
+
+        self.client.force_authenticate(user=self.current_user)
+        # One query for the matching users and one for all of their friendships.
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                self.url, data={'query_string': 'lebronclone'})
+        self.assertEqual(len(response.data), 15)
+        statuses = {result['user_data']['username']: result['status'] for result in response.data}
+        self.assertEqual(statuses['lebronclone0'], 'You have requested friendship.')
+        self.assertEqual(statuses['lebronclone1'], 'Pending friendship request.')
+
+    def test_results_ordered_by_uppercase_username(self):
+        # Both the database and the index order by the uppercase username, then the username.
+        usernames = ["zzb", "ZZB", "zz_c", "zz.d", "ZZa", "zzA", "zz1"] + [f"zzz{i:02d}" for i in range(10)]
+        for username in usernames:
+            User.objects.create_user(username=username, email=f"{username}@example.com", password="password123")
+        self.client.force_authenticate(user=self.current_user)
+        response = self.client.post(self.url, data={'query_string': 'zz'})
+        self.assertEqual([result['user_data']['username'] for result in response.data],
+                         sorted(usernames, key=lambda username: (username.upper(), username))[:15])
+
     def test_no_match_found(self):
 
         self.client.force_authenticate(user=self.current_user)
@@ -99,3 +127,46 @@ class UserSearchTest(TestCase):
             self.url, data={'query_string': 'uniqueuname'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 0)
+
+
+@override_settings(USER_SEARCH_INDEX=True)
+class IndexedUserSearchTest(UserSearchTest):
+    # Runs every user search test against the in-memory username index.
+    def setUp(self):
+        username_index.invalidate()
+        super().setUp()
+
+    def search(self, query_string):
+        response = self.client.post(self.url, data={'query_string': query_string})
+        return [result['user_data']['username'] for result in response.data]
+
+    def test_only_friendships_queried(self):
+        self.client.force_authenticate(user=self.current_user)
+        self.search('lebron')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.search('LEBRON'), ['lebronjames', 'lebronjamesfanpage', 'lebronjamesjr'])
+
+    def test_index_follows_changes(self):
+        self.client.force_authenticate(user=self.current_user)
+        self.assertEqual(self.search('lbj'), ['lbjking'])
+
+        self.user4.username = 'kinglbj'
+        self.user4.save()
+        self.user1.is_active = False
+        self.user1.save()
+        User.objects.create_user(username='lbjnewbie', email='newbie@mail.com', password='Password123')
+
+        self.assertEqual(self.search('lbj'), ['lbjnewbie'])
+        self.assertEqual(self.search('king'), ['kinglbj'])
+        self.assertEqual(self.search('lebronjames'), ['lebronjamesfanpage', 'lebronjamesjr'])
+
+        self.user2.delete()
+        self.assertEqual(self.search('lebronjames'), ['lebronjamesfanpage'])
+
+    @override_settings(USER_SEARCH_INDEX_TIMEOUT=0)
+    def test_rebuilt_when_expired(self):
+        self.client.force_authenticate(user=self.current_user)
+        self.search('lbj')
+        # Changes made without signals, like those from other processes, are picked up on rebuild.
+        User.objects.filter(pk=self.user4.pk).update(username='lbjqueen')
+        self.assertEqual(self.search('lbj'), ['lbjqueen'])
@@ -0,0 +1,31 @@
+"""
+Batching work to do once a transaction commits.
+
+Deleting files and invalidating responses can be requested many times in one transaction, but should
+only be done once, after it commits. `on_commit_batch()` returns a single callback object for the current
+savepoint, which the work is added to. Each savepoint has its own batch, so the work of a savepoint that
+is rolled back is dropped with it, just as Django drops the callbacks registered in it.
+"""
+from django.db import transaction
+
+
+def on_commit_batch(cls, using=None):
+    """
+    Returns the instance of `cls` that is called once the current transaction commits, registering a new one
+    if the current savepoint doesn't have one yet, or None when there is no transaction.
+    `cls` is called with no arguments to create a batch.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+
+    # Django keeps each callback in `run_on_commit` as (savepoint ids, callback, robust). This isn't a public
+    # API, so it is only relied on here, and a batch is registered for every call if it ever changes.
+    savepoint_ids = set(connection.savepoint_ids)
+    for registered in connection.run_on_commit:
+        if (isinstance(registered, tuple) and len(registered) >= 2 and isinstance(registered[1], cls)
+                and registered[0] == savepoint_ids):
+            return registered[1]
+    batch = cls()
+    transaction.on_commit(batch, using=using)
+    return batch
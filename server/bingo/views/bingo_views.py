@@ -1,15 +1,20 @@
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
-from ..models import BingoGrid, TileInteraction
-from ..serializers import (
-    BingoGridSerializer, ChallengeCompleteSerializer, UpdateBingoGridSerializer)
-from .utils import check_bingo
+from .. import grid_cache, leaderboard, response_cache
+from ..engine import get_progress
+from ..models import BingoGrid, Challenge, TileInteraction
+from ..routers import read_only_view
+from ..serializers import ChallengeCompleteSerializer, UpdateBingoGridSerializer
+from ..tasks import queue_tile_image
+from .utils import check_bingo, etag_matches, make_etag, not_modified
 
 
 @api_view(['POST'])
@@ -21,7 +26,7 @@ def start_challenge(request):
         if challenge_index not in range(16):
             return Response(status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-        grid = BingoGrid.objects.get(is_active=True)
+        grid = grid_cache.get_active_grid().grid
 
         TileInteraction.objects.create(
             user=request.user, position=challenge_index, grid=grid
@@ -38,6 +43,8 @@ def start_challenge(request):
 
 
 @api_view(['GET'])
+@read_only_view
+@response_cache.cache_anonymous_response(response_cache.GRID)
 def get_bingo_grid(request):
     """
     This view returns data with the following fields.
@@ -46,25 +53,41 @@ def get_bingo_grid(request):
     Each challenge dictionary contains the 'name', 'description', 'challenge_type', and 'points' of the challenge.
     If the user is authenticated, then each challenge dictionary will also contain the 'status' of completion
     for that user.
+    The ETag is made from the grid and, for authenticated users, their progress, so unchanged grids aren't resent.
     """
-    # Fetch the currently active bingo grid.
-    active_grid = get_object_or_404(BingoGrid, is_active=True)
-    # Serialized form of object
-    grid = BingoGridSerializer(active_grid).data
+    # Get the version first, so the ETag can't be newer than the grid.
+    grid_version = response_cache.get_version(response_cache.GRID)
+    # Fetch the currently active bingo grid, which is cached already serialised.
+    try:
+        active_grid = grid_cache.get_active_grid()
+    except BingoGrid.DoesNotExist:
+        raise Http404("No BingoGrid matches the given query.")
 
     logged_in = request.user.is_authenticated
     if logged_in:
-        # Find all tiles of the active bingo grid that the user has interacted with.
-        user_interaction = TileInteraction.objects.filter(
-            user=request.user, grid=active_grid)
-        # By default, a tile will not have been started.
-        for chal in grid['challenges']:
-            chal['status'] = "not started"
-        # If a user interaction exists with a tile, change its completion status accordingly
-        if user_interaction:
-            for tile in user_interaction:
-                grid['challenges'][tile.position]['status'] = 'completed' if tile.completed else 'started'
-    return Response(grid, status=status.HTTP_200_OK)
+        # The tiles the user has started and completed are stored as bitmasks.
+        progress = get_progress(request.user.pk, active_grid.grid.pk)
+        etag = make_etag('grid', active_grid.grid.pk, grid_version, request.user.pk,
+                         progress.started_mask, progress.completed_mask)
+    else:
+        etag = make_etag('grid', active_grid.grid.pk, grid_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Copy the cached challenges, as they are shared between requests.
+    grid = {'grid_id': active_grid.data['grid_id'],
+            'challenges': [dict(chal) for chal in active_grid.data['challenges']]}
+
+    if logged_in:
+        for position, chal in enumerate(grid['challenges']):
+            bit = 1 << position
+            if progress.completed_mask & bit:
+                chal['status'] = 'completed'
+            elif progress.started_mask & bit:
+                chal['status'] = 'started'
+            else:
+                chal['status'] = "not started"
+    return Response(grid, status=status.HTTP_200_OK, headers={'ETag': etag})
 
 
 @api_view(['PATCH'])
@@ -79,9 +102,11 @@ def complete_challenge(request):
     'bingo_diag' contains the diagonal in which a bingo was just achieved, if any, denoted by the first row
     tile the diagonal contains, either 0 or 3, -1 if no bingo.
     'full_bingo' contains a boolean, representing whether the full grid has been completed.
+    'image_status' contains the status of the uploaded image, which is 'pending' until it has been processed
+    in the background, or 'ready' or 'failed' when TILE_IMAGE_ASYNC is off and it was processed in the request.
     """
     try:
-        active_grid = BingoGrid.objects.get(is_active=True)
+        active_grid = grid_cache.get_active_grid()
     except BingoGrid.DoesNotExist:
         return Response(
             {"message": "No bingo grid found. Please contact support."},
@@ -90,36 +115,40 @@ def complete_challenge(request):
     serializer = ChallengeCompleteSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    tile = get_object_or_404(TileInteraction, user=request.user,
-                             grid=active_grid, position=serializer.validated_data['position'])
-
-    # Update consent and image fields.
-    tile.consent = serializer.validated_data['consent']
-    tile.image = serializer.validated_data['image']
-    # Add description if provided in the serializer data
-    if 'description' in serializer.validated_data:
-        tile.description = serializer.validated_data['description']
-
-    # Points should only be awarded once.
-    if tile.completed:
-        return Response({'error': 'Challenge has already been completed for this user.'}, status=status.HTTP_409_CONFLICT)
-
-    tile.completed = True
-    tile.date_completed = timezone.now()
-    tile.save()
-
-    challenge = active_grid.challenges.all()[tile.position]
-    challenge.total_completions += 1
-    challenge.save()
-
-    bingos = check_bingo(tile)
-    response = {'challenge_points': challenge.points}
-    response.update(bingos)
-
-    user = request.user
-    user.total_points += challenge.points + bingos['bingo_points']
-    user.save()
-
+    updated_fields = ['consent', 'raw_image', 'image_status', 'description', 'completed', 'date_completed']
+
+    with transaction.atomic():
+        # Lock the tile so that concurrent requests can't complete it twice.
+        tile = get_object_or_404(TileInteraction.objects.select_for_update(), user=request.user,
+                                 grid=active_grid.grid, position=serializer.validated_data['position'])
+
+        # Points should only be awarded once.
+        if tile.completed:
+            return Response({'error': 'Challenge has already been completed for this user.'}, status=status.HTTP_409_CONFLICT)
+
+        # Update consent and image fields. The image is only stored here, it is resized in the background.
+        tile.consent = serializer.validated_data['consent']
+        tile.raw_image = serializer.validated_data['image']
+        tile.image_status = TileInteraction.IMAGE_PENDING
+        # Add description if provided in the serializer data
+        if 'description' in serializer.validated_data:
+            tile.description = serializer.validated_data['description']
+        tile.completed = True
+        tile.date_completed = timezone.now()
+        tile.save(update_fields=updated_fields)
+
+        challenge = active_grid.challenges[tile.position]
+        bingos = check_bingo(tile)
+        response = {'challenge_points': challenge.points}
+        response.update(bingos)
+
+        leaderboard.add_points(request.user, challenge.points + bingos['bingo_points'])
+
+        # Every user completing this challenge updates the same row, so do it last to hold its lock briefly.
+        Challenge.objects.filter(pk=challenge.pk).update(
+            total_completions=F('total_completions') + 1)
+
+    response['image_status'] = queue_tile_image(tile)
     return Response(response, status.HTTP_200_OK)
 
 
@@ -128,13 +157,14 @@ def complete_challenge(request):
 def update_bingo_grid(request):
     serializer = UpdateBingoGridSerializer(data=request.data)
     if serializer.is_valid():
-        old_grids = BingoGrid.objects.filter(is_active=True)
-        new_grid = serializer.create(serializer.validated_data)
-        for old_grid in old_grids:
-            old_grid.is_active = False
-            old_grid.save()
-        new_grid.is_active = True
-        new_grid.save()
+        with transaction.atomic():
+            old_grids = BingoGrid.objects.filter(is_active=True)
+            new_grid = serializer.create(serializer.validated_data)
+            for old_grid in old_grids:
+                old_grid.is_active = False
+                old_grid.save()
+            new_grid.is_active = True
+            new_grid.save()
         return Response({"message": "Bingo grid successfully updated."}, status=status.HTTP_201_CREATED)
     else:
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
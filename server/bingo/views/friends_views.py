@@ -7,6 +7,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
 from ..models import Friendship, User
+from ..routers import read_only_view
 from ..serializers import FriendshipUserSerializer
 
 
@@ -79,52 +80,33 @@ def accept_friendship(request, friendship_id):
 
 @api_view(['GET'])
 @permission_classes((permissions.IsAuthenticated, ))
+@read_only_view
 def get_all_friends_data(request):
     """Get all friends data including current friends, incoming and outgoing requests in a single request.
     Requires authentication."""
-    # Get all friendships
+    # Get all friendships, along with the users on both sides, in one query.
     all_friendships = Friendship.objects.filter(
         Q(requester=request.user) | Q(receiver=request.user)
-    )
-    # Get accepted friendships
-    accepted_friendships = all_friendships.filter(status=Friendship.ACCEPTED)
-    current_friends = []
-    for friendship in accepted_friendships:
-        friend = (friendship.receiver if friendship.requester == request.user else friendship.requester)
-        serializer = FriendshipUserSerializer(
-            friend,
-            context={'friendship': friendship}
-        )
-        current_friends.append(serializer.data)
+    ).select_related('requester', 'receiver')
 
-    # Get pending incoming requests
-    incoming_friendships = all_friendships.filter(
-        status=Friendship.PENDING,
-        receiver=request.user
-    )
+    current_friends = []
     incoming_requests = []
-    for friendship in incoming_friendships:
-        serializer = FriendshipUserSerializer(
-            friendship.requester,
-            context={'friendship': friendship}
-        )
-        incoming_requests.append(serializer.data)
-
-    # Get pending outgoing requests
-    outgoing_friendships = all_friendships.filter(
-        status=Friendship.PENDING,
-        requester=request.user
-    )
     outgoing_requests = []
-    for friendship in outgoing_friendships:
-        serializer = FriendshipUserSerializer(
-            friendship.receiver,
-            context={'friendship': friendship}
-        )
-        outgoing_requests.append(serializer.data)
+    friendships_by_user = {}
+    for friendship in all_friendships:
+        is_requester = friendship.requester_id == request.user.pk
+        friend = friendship.receiver if is_requester else friendship.requester
+        friendships_by_user[friend.pk] = friendship
+        if friendship.status == Friendship.ACCEPTED:
+            current_friends.append(friend)
+        elif friendship.status == Friendship.PENDING:
+            (outgoing_requests if is_requester else incoming_requests).append(friend)
+
+    def serialize(friends):
+        return FriendshipUserSerializer(friends, many=True, context={'friendships': friendships_by_user}).data
 
     return Response({
-        "current_friends": current_friends,
-        "incoming_requests": incoming_requests,
-        "outgoing_requests": outgoing_requests
+        "current_friends": serialize(current_friends),
+        "incoming_requests": serialize(incoming_requests),
+        "outgoing_requests": serialize(outgoing_requests)
     }, status=status.HTTP_200_OK)
@@ -1,14 +1,19 @@
+from django.conf import settings
+from django.db.models.functions import Collate, Upper
 from django.shortcuts import get_object_or_404
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
+from .. import grid_cache, response_cache
 from ..models import TileInteraction, User
 from ..serializers import (UpdatePreferencesSerializer, UserProfileSerializer,
                            UserRegisterSerializer, UserSearchSerializer,
                            ProfilePageSerializer, ProfilePageChallengeSerializer,
                            ProfilePageTileSerializer)
-from .utils import check_friendships, check_access
+from ..routers import read_only_view
+from ..search import username_index
+from .utils import check_friendships, check_access, etag_matches, make_etag, not_modified
 
 
 @api_view(['POST'])
@@ -44,6 +49,7 @@ def update_user_preferences(request):
 
 @api_view(['POST'])
 @permission_classes((permissions.IsAuthenticated, ))
+@read_only_view
 def find_user(request):
     """
     This view will return a set of users whose usernames begin with a given string.
@@ -62,30 +68,47 @@ def find_user(request):
         return Response({'error': 'Field "query_string" is required in this request'},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    user_set = User.objects.filter(
-        username__istartswith=query_string, is_active=True, is_superuser=False).order_by('username')[:USERS_RETURNED]
-    serializer = UserSearchSerializer(user_set, many=True)
-    response = check_friendships(serializer.data, request.user)
+    if settings.USER_SEARCH_INDEX:
+        user_data = username_index.search(query_string, USERS_RETURNED)
+    else:
+        # In the same order as the index, whatever the database's collation.
+        user_set = User.objects.filter(
+            username__istartswith=query_string, is_active=True, is_superuser=False
+        ).order_by(Collate(Upper('username'), 'C'), Collate('username', 'C'))[:USERS_RETURNED]
+        user_data = UserSearchSerializer(user_set, many=True).data
+    response = check_friendships(user_data, request.user)
     return Response(response, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
+@read_only_view
 def get_profile_page(request, username):
     """
     Gets all info from the profile page
     Both user information and information about challenges completed
+    The ETag is made from the versions of the user's profile and of the grids, and whether the profile can be viewed.
     """
     target_user = get_object_or_404(
         User, username=username, is_active=True, is_superuser=False)
 
+    permission = check_access(request.user, target_user)
+    etag = make_etag('profile', target_user.pk, response_cache.get_version(response_cache.profile(target_user.pk)),
+                     response_cache.get_version(response_cache.GRID), int(permission))
+    if response_cache.read_fresh(response_cache.profile(target_user.pk), response_cache.GRID):
+        # The user was read from a replica that might not have their latest changes yet.
+        target_user = get_object_or_404(User, pk=target_user.pk, is_active=True, is_superuser=False)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     user_info = ProfilePageSerializer(target_user).data
 
-    if not check_access(request.user, target_user):
-        return Response({"user_info": user_info, "challenges": [], "permission": False}, status=status.HTTP_200_OK)
+    if not permission:
+        return Response({"user_info": user_info, "challenges": [], "permission": False},
+                        status=status.HTTP_200_OK, headers={'ETag': etag})
 
-    target_tiles = TileInteraction.objects.filter(user=target_user)
-    target_challenges = [list(tile.grid.challenges.all())[
-        tile.position] for tile in target_tiles]
+    target_tiles = list(TileInteraction.objects.filter(user=target_user))
+    # The challenges of each grid are loaded once, rather than once per tile.
+    target_challenges = grid_cache.get_tile_challenges(target_tiles)
 
     tiles_data = ProfilePageTileSerializer(target_tiles, many=True).data
     challenges_data = (ProfilePageChallengeSerializer(
@@ -98,4 +121,4 @@ def get_profile_page(request, username):
         "challenges": challenges_tiles_data,
         "permission": True
     }
-    return Response(response_data, status=status.HTTP_200_OK)
+    return Response(response_data, status=status.HTTP_200_OK, headers={'ETag': etag})
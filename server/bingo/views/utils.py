@@ -1,8 +1,10 @@
-from django.conf import settings
-import math
+from django.db.models import Q
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import status
 from rest_framework.response import Response
-from ..models import TileInteraction, Friendship
+from .. import friend_cache
+from ..engine import find_bingos, get_progress
+from ..models import Friendship
 from ..serializers import FriendshipUserSerializer
 
 
@@ -23,10 +25,8 @@ def check_access(current_user, target_user):
     if current_user.is_staff or current_user == target_user:
         return True
 
-    # Check if `current_user` and `target_user` are friends.
-    elif (current_user.is_authenticated and
-          (Friendship.objects.filter(requester=current_user, receiver=target_user, status=Friendship.ACCEPTED).exists() or
-           Friendship.objects.filter(requester=target_user, receiver=current_user, status=Friendship.ACCEPTED).exists())):
+    # Check if `current_user` and `target_user` are friends, using the cached set of friends.
+    elif current_user.is_authenticated and friend_cache.are_friends(current_user, target_user):
         return target_user.visibility != 0
 
     # Public profiles (visibility=2) are accessible to everyone.
@@ -34,100 +34,56 @@ def check_access(current_user, target_user):
 
 
 def check_bingo(tile):
-    # Every tile that relates to this user/grid combo.
-    all_tiles = TileInteraction.objects.filter(user=tile.user, grid=tile.grid)
-
-    # Size of the bingo grid.
-    grid_size = 16
-    grid_width = int(math.sqrt(grid_size))
-    completion_grid = grid_size*[0]
-
-    # One-dimensional array to represent the bingo grid, and completion of the challenges.
-    for t in all_tiles:
-        completion_grid[t.position] = 1 if t.completed else 0
-    # Coordinates of the tile.
-    tile_row = tile.position // grid_width
-    tile_col = tile.position % grid_width
-    bingos = {'bingo_row': -1,
-              'bingo_col': -1,
-              'bingo_diag': -1,
-              'full_bingo': False,
-              'bingo_points': 0}
-
-    # Helper function for checking a bingo in a line/diagonal
-    def check_line(indices):
-        return all(completion_grid[i] for i in indices)
-
-    # Check the row for bingo.
-    row_indices = range(tile_row*grid_width, tile_row*grid_width+grid_width)
-    if check_line(row_indices):
-        bingos['bingo_row'] = tile_row
-        bingos['bingo_points'] += settings.BINGO_COMPLETE
-
-    # Check the column for bingo.
-    col_indices = range(tile_col, grid_size, grid_width)
-    if check_line(col_indices):
-        bingos['bingo_col'] = tile_col
-        bingos['bingo_points'] += settings.BINGO_COMPLETE
-
-    # If the tile exists in a diagonal, check the diagonal for bingos.
-    if tile_row == tile_col:
-        # This diagonal goes top left to bottom right.
-        diag1_indices = range(0, grid_size, grid_width+1)
-        if check_line(diag1_indices):
-            bingos['bingo_diag'] = 0
-            bingos['bingo_points'] += settings.BINGO_COMPLETE
-    if tile_row + tile_col == grid_width - 1:
-        # This diagonal goes bottom left to top right.
-        diag2_ranges = range(grid_width - 1, grid_size - 1, grid_width - 1)
-        if check_line(diag2_ranges):
-            bingos['bingo_diag'] = 3
-            bingos['bingo_points'] += settings.BINGO_COMPLETE
-
-    if len(all_tiles) == grid_size:
-        # Check for full bingo
-        if all(completion_grid):
-            bingos['full_bingo'] = True
-            bingos['bingo_points'] += settings.GRID_COMPLETE
-    return bingos
+    """
+    Returns the bingos completed by a tile that has just been completed.
+    The user's tiles are read from their `GridProgress`, so only a single row is fetched.
+    """
+    progress = get_progress(tile.user_id, tile.grid_id)
+    return find_bingos(progress.completed_mask, tile.position)
+
+
+def get_friendships(current_user, user_ids):
+    """
+    Returns a dictionary mapping each user id in `user_ids` that has a friendship with `current_user`
+    to that friendship, using a single query.
+    """
+    friendships = Friendship.objects.filter(
+        Q(requester=current_user, receiver__in=user_ids) | Q(receiver=current_user, requester__in=user_ids))
+    friendships_by_user = {}
+    for friendship in friendships:
+        if friendship.requester_id == current_user.pk:
+            friendships_by_user[friendship.receiver_id] = friendship
+        else:
+            # A request sent by the current user takes precedence over one they received.
+            friendships_by_user.setdefault(friendship.requester_id, friendship)
+    return friendships_by_user
+
+
+def get_friendship_status(current_user, friendship):
+    """
+    Returns the status message of a friendship (or None) from the point of view of `current_user`,
+    along with the friendship id if it is a request that `current_user` can accept.
+    """
+    if friendship is None:
+        return {'status': 'You are not friends.'}
+    if friendship.status == Friendship.ACCEPTED:
+        return {'status': 'You are friends.'}
+    if friendship.requester_id == current_user.pk:
+        return {'status': 'You have requested friendship.'}
+    return {'status': 'Pending friendship request.', 'friendship_id': friendship.id}
 
 
 def check_friendships(user_set, current_user):
+    friendships = get_friendships(current_user, [user['user_id'] for user in user_set])
     list_out = []
     for user in user_set:
         # Skip if this is the current user
         if user['user_id'] == current_user.user_id:
             continue
-        # Check if current user is requester
-        friendship = get_or_none(Friendship, requester=current_user, receiver=user['user_id'])
-        if friendship:
-            if friendship.status == friendship.PENDING:
-                list_out.append(
-                    {'user_data': user, 'status': 'You have requested friendship.'})
-            elif friendship.status == friendship.ACCEPTED:
-                list_out.append(
-                    {'user_data': user, 'status': 'You are friends.'})
-        # Check if current user is receiver
-        elif (friendship := get_or_none(Friendship, requester=user['user_id'], receiver=current_user)) is not None:
-            if friendship.status == friendship.PENDING:
-                list_out.append(
-                    {'user_data': user, 'status': 'Pending friendship request.', 'friendship_id': friendship.id})
-            elif friendship.status == friendship.ACCEPTED:
-                list_out.append(
-                    {'user_data': user, 'status': 'You are friends.'})
-        else:
-            list_out.append(
-                {'user_data': user, 'status': 'You are not friends.'})
+        list_out.append({'user_data': user, **get_friendship_status(current_user, friendships.get(user['user_id']))})
     return list_out
 
 
-def get_or_none(classmodel, **kwargs):
-    try:
-        return classmodel.objects.get(**kwargs)
-    except classmodel.DoesNotExist:
-        return None
-
-
 def get_friend_requests(request, is_outgoing=True):
     """Helper function to get friend requests.
     Args:
@@ -151,3 +107,25 @@ def get_friend_requests(request, is_outgoing=True):
         )
         result.append(serializer.data)
     return Response(result, status=status.HTTP_200_OK)
+
+
+def make_etag(*parts):
+    """
+    Returns an ETag made up of the parts, which should identify the version of a response.
+    """
+    return quote_etag('-'.join(str(part) for part in parts))
+
+
+def etag_matches(request, etag):
+    """
+    Returns whether the request's If-None-Match header matches the ETag, ignoring weak validators.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag.removeprefix('W/') in (tag.removeprefix('W/') for tag in etags)
+
+
+def not_modified(etag):
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})